@@ -11,6 +11,7 @@ Usage:
 
 import sys
 import os
+import json
 import asyncio
 import logging
 from pathlib import Path
@@ -42,6 +43,8 @@ if Path("/app/agent_worker").exists():
     if Path("/app/CUA").exists():
         sys.path.insert(0, "/app/CUA")
 
+# Separator line for console sections, including the AGENT_RESPONSE block
+SEPARATOR = "=" * 60
 
 
 
@@ -102,6 +105,62 @@ def get_task_description():
     return task_description  # Return empty string if not provided (for polling mode)
 
 
+def _silence_output():
+    """Point stdout/stderr (file descriptors 1 and 2) at /dev/null; returns the originals."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = (os.dup(1), os.dup(2))
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    return saved_fds
+
+
+def _restore_output(saved_fds):
+    """Undo _silence_output."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for fd, saved in zip((1, 2), saved_fds):
+        os.dup2(saved, fd)
+        os.close(saved)
+
+
+def wait_for_prefork_task():
+    """
+    Pre-forked worker mode (started by runner.py with --prefork).
+    
+    Imports the CUA packages up front, then blocks until the runner writes the
+    task as one JSON line on stdin. The payload's env entries are applied and the
+    process moves into the task workdir before the normal single-task run starts.
+    
+    Anything written to stdout/stderr before the task arrives goes to /dev/null so
+    it can't end up in the next task's logs (or fill the pipes while idle).
+    """
+    saved_fds = _silence_output()
+    try:
+        try:
+            import agent  # noqa: F401
+            import computer  # noqa: F401
+        except Exception:
+            # Import problems are reported by the diagnostics once the task runs
+            pass
+        
+        line = sys.stdin.readline()
+    finally:
+        _restore_output(saved_fds)
+    
+    if not line:
+        # Runner discarded this worker without handing over a task
+        sys.exit(0)
+    
+    payload = json.loads(line)
+    os.environ.update(payload.get("env") or {})
+    if payload.get("workdir"):
+        os.chdir(payload["workdir"])
+    sys.argv = [sys.argv[0], payload["task_description"]]
+
+
 async def execute_task_async(task_description: str, task_id: Optional[int] = None, mongo_client: Optional[Any] = None) -> dict:
     """
     Execute a task using CUA agent and return results.
@@ -113,7 +172,7 @@ async def execute_task_async(task_description: str, task_id: Optional[int] = Non
         Dictionary with execution results
     """
     print(f"Executing task: {task_description}")
-    print("=" * 60)
+    print(SEPARATOR)
     
     result = {
         "status": "success",
@@ -131,7 +190,7 @@ async def execute_task_async(task_description: str, task_id: Optional[int] = Non
         print("Errors found:")
         for error in diagnostics['errors']:
             print(f"  - {error}")
-    print("=" * 60)
+    print(SEPARATOR)
     print()
     
     try:
@@ -470,6 +529,9 @@ def execute_task(task_description: str, task_id: Optional[int] = None, mongo_cli
 
 def main():
     """Main entry point."""
+    if sys.argv[1:] == ["--prefork"]:
+        wait_for_prefork_task()
+    
     task_description = get_task_description()
     
     # If no task description provided, run in polling mode using runner
@@ -502,9 +564,9 @@ def main():
         return
     
     # Single task execution mode
-    print("=" * 60)
+    print(SEPARATOR)
     print("AGENT WORKER TASK EXECUTOR")
-    print("=" * 60)
+    print(SEPARATOR)
     print()
     
     # Get task_id and mongo_client from environment if available
@@ -530,9 +592,9 @@ def main():
     result = execute_task(task_description, task_id=task_id, mongo_client=mongo_client)
     
     print()
-    print("=" * 60)
+    print(SEPARATOR)
     print("EXECUTION RESULT")
-    print("=" * 60)
+    print(SEPARATOR)
     print(f"Status: {result['status']}")
     if result['output']:
         print(f"Output:\n{result['output']}")
@@ -542,9 +604,9 @@ def main():
     # Output the response in a structured format that can be easily extracted
     # This marker helps runner.py extract just the agent response
     print()
-    print("=" * 60)
+    print(SEPARATOR)
     print("AGENT_RESPONSE_START")
-    print("=" * 60)
+    print(SEPARATOR)
     if result['output']:
         # Output just the agent response, not diagnostics
         print(result['output'])
@@ -552,9 +614,9 @@ def main():
         print(f"Error: {result['error']}")
     else:
         print("No output or error")
-    print("=" * 60)
+    print(SEPARATOR)
     print("AGENT_RESPONSE_END")
-    print("=" * 60)
+    print(SEPARATOR)
     
     # Check for collaboration and wait if needed
     if result['status'] == 'success' and task_id:
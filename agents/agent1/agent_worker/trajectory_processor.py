@@ -1,14 +1,32 @@
 """
 Lean trajectory processor - watches CUA trajectory files and stores in MongoDB.
 """
+import os
+import sys
 import json
+import mmap
+import queue
+import atexit
 import base64
+import hashlib
+import logging
+import logging.handlers
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Union, FrozenSet
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+# orjson parses trajectory files several times faster than stdlib json; fall back if not installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
 # Import db_adapters - try absolute first (for direct execution), then relative (for package import)
 try:
     from db_adapters import MongoClientWrapper
@@ -17,13 +35,178 @@ except ImportError:
         from .db_adapters import MongoClientWrapper
     except ImportError:
         # Last resort: add current directory to path
-        import sys
-        from pathlib import Path
         current_dir = Path(__file__).parent
         if str(current_dir) not in sys.path:
             sys.path.insert(0, str(current_dir))
         from db_adapters import MongoClientWrapper
 
+logger = logging.getLogger(__name__)
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+# Keep the full parsed document on unmatched-file logs only when explicitly requested
+STORE_TRAJECTORY_BODY = os.getenv("TRAJECTORY_STORE_BODY", "false").lower() in ("true", "1", "yes")
+
+# Files above this size are mmap'ed and parsed in place (orjson only) instead of copied into bytes
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+# Upper bound on remembered files; the least recently seen entries are evicted first
+PROCESSED_FILES_MAX = 100_000
+
+# Quiet period before a modified file is re-read; writers emit several modify events per write
+MODIFY_DEBOUNCE_SECONDS = 0.05
+
+# Key paths to response-style "output" lists, probed in order
+OUTPUT_SCHEMAS: Tuple[Tuple[str, ...], ...] = (("response", "output"), ("output",))
+
+# Top-level fields that may hold a message string or a {"text": ...} dict
+TEXT_FIELDS: Tuple[str, ...] = ("text", "result", "message", "content", "response_text")
+
+# Every top-level key any schema looks at; documents with none of them are skipped outright
+SCHEMA_KEYS = frozenset(path[0] for path in OUTPUT_SCHEMAS) | frozenset(TEXT_FIELDS) | {"role"}
+
+
+def _append_text(value: Any, messages: List[str]) -> None:
+    """Append value to messages if it is a non-blank string."""
+    if type(value) is str:
+        value = value.strip()
+        if value:
+            messages.append(value)
+
+
+def _walk_output(output: Any, messages: List[str]) -> None:
+    """Collect message text from a response-style output list."""
+    if type(output) is not list:
+        return
+    for item in output:
+        if type(item) is not dict or item.get("type") != "message":
+            continue
+        content = item.get("content", [])
+        if type(content) is list:
+            for content_item in content:
+                # output_text items and any item carrying a direct text field
+                if type(content_item) is dict and (content_item.get("type") == "output_text" or "text" in content_item):
+                    _append_text(content_item.get("text"), messages)
+        else:
+            # Content may also be a plain string
+            _append_text(content, messages)
+
+
+def extract_messages(data: Any) -> List[str]:
+    """Extract all meaningful messages/results from JSON data using multiple schema patterns.
+    
+    Schemas are probed in order and the first one that yields messages wins,
+    so the remaining lookups are skipped for the typical single-schema file.
+    Kept as a fully annotated module-level function so it can be compiled
+    with mypyc or Cython without touching the processor class.
+    """
+    messages: List[str] = []
+    
+    if type(data) is not dict:
+        return messages
+    
+    # One set intersection decides which schemas can possibly match
+    present = data.keys() & SCHEMA_KEYS
+    if not present:
+        return messages
+    
+    # Schemas 1 and 2: response.output / direct output structure
+    for path in OUTPUT_SCHEMAS:
+        if path[0] not in present:
+            continue
+        node: Any = data
+        for key in path:
+            node = node.get(key) if type(node) is dict else None
+        _walk_output(node, messages)
+        if messages:
+            return messages
+    
+    # Schema 3: role-based messages (assistant role)
+    if "role" in present and data["role"] == "assistant":
+        content = data.get("content")
+        if type(content) is list:
+            for item in content:
+                _append_text(item.get("text") if type(item) is dict else item, messages)
+        else:
+            _append_text(content, messages)
+        if messages:
+            return messages
+    
+    # Schema 4: direct text/result fields
+    for field in TEXT_FIELDS:
+        if field not in present:
+            continue
+        value = data[field]
+        if type(value) is dict:
+            value = value.get("text")
+        _append_text(value, messages)
+    
+    # Schema 5: nested result/response structures
+    # result.text is already covered by schema 4, only result.output is new here
+    result = data.get("result") if "result" in present else None
+    if type(result) is dict:
+        _append_text(result.get("output"), messages)
+    
+    return messages
+
+
+def _iter_json(root: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield (path, stat) for every .json file under root, without building Path objects."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.json'):
+                        try:
+                            yield entry.path, entry.stat()
+                        except OSError:
+                            # File vanished between listing and stat
+                            continue
+        except OSError:
+            continue
+
+
+def _read_file(path: str, size_hint: int) -> bytes:
+    """Read a whole file with one os.read sized from an existing stat (open/read/close only)."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        # Ask for one byte more than expected: a short read means EOF, so no extra read call
+        buf = os.read(fd, size_hint + 1)
+        if len(buf) <= size_hint:
+            return buf
+        # File grew since it was stat'ed - read the remainder
+        chunks = [buf]
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+def _read_buffer(path: str, size_hint: int) -> Union[bytes, mmap.mmap]:
+    """Read a trajectory file as bytes, or map it read-only when large and orjson can parse it in place.
+    
+    The caller must close a returned mmap.
+    """
+    if orjson is not None and size_hint > MMAP_THRESHOLD_BYTES:
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _read_file(path, size_hint)
+
+
+def _parse_buffer(buf: Union[bytes, mmap.mmap]) -> Any:
+    """Parse JSON straight from the raw bytes/mapping, without decoding to str first."""
+    if type(buf) is mmap.mmap:
+        with memoryview(buf) as view:
+            return orjson.loads(view)
+    return _json_loads(buf)
+
 
 class TrajectoryProcessor(FileSystemEventHandler):
     """Processes CUA trajectory files in real-time and stores in MongoDB."""
@@ -32,7 +215,13 @@ class TrajectoryProcessor(FileSystemEventHandler):
         self.trajectory_dir = Path(trajectory_dir)
         self.mongo = mongo_client
         self.task_id = task_id
-        self.processed_files = set()
+        # (st_dev, st_ino) -> ((st_mtime_ns, st_size), sha1 digest, hashes of messages already logged)
+        # for the version last processed, in LRU order
+        self.processed_files: "OrderedDict[Tuple[int, int], Tuple[Tuple[int, int], bytes, FrozenSet[int]]]" = OrderedDict()
+        # The watchdog thread and debounce timers may process the same file concurrently
+        self._processed_lock = threading.Lock()
+        self._debounce_timers: Dict[str, threading.Timer] = {}
+        self._debounce_lock = threading.Lock()
         
         # Ensure directory exists
         self.trajectory_dir.mkdir(parents=True, exist_ok=True)
@@ -41,107 +230,16 @@ class TrajectoryProcessor(FileSystemEventHandler):
         self._process_existing()
     
     def _extract_messages_from_json(self, data: Dict[str, Any]) -> List[str]:
-        """Extract all meaningful messages/results from JSON data using multiple schema patterns."""
-        messages = []
-        
-        if not isinstance(data, dict):
-            return messages
-        
-        # Schema 1: response.output structure
-        if "response" in data:
-            response = data["response"]
-            if isinstance(response, dict) and "output" in response:
-                output = response["output"]
-                if isinstance(output, list):
-                    for item in output:
-                        if isinstance(item, dict) and item.get("type") == "message":
-                            content = item.get("content", [])
-                            if isinstance(content, list):
-                                for content_item in content:
-                                    if isinstance(content_item, dict):
-                                        # Try output_text type
-                                        if content_item.get("type") == "output_text":
-                                            text = content_item.get("text")
-                                            if isinstance(text, str) and text.strip():
-                                                messages.append(text.strip())
-                                        # Try direct text field
-                                        elif "text" in content_item:
-                                            text = content_item.get("text")
-                                            if isinstance(text, str) and text.strip():
-                                                messages.append(text.strip())
-        
-        # Schema 2: direct output structure
-        if "output" in data:
-            output = data["output"]
-            if isinstance(output, list):
-                for item in output:
-                    if isinstance(item, dict) and item.get("type") == "message":
-                        content = item.get("content", [])
-                        if isinstance(content, list):
-                            for content_item in content:
-                                if isinstance(content_item, dict):
-                                    # Try output_text type
-                                    if content_item.get("type") == "output_text":
-                                        text = content_item.get("text")
-                                        if isinstance(text, str) and text.strip():
-                                            messages.append(text.strip())
-                                    # Try direct text field
-                                    elif "text" in content_item:
-                                        text = content_item.get("text")
-                                        if isinstance(text, str) and text.strip():
-                                            messages.append(text.strip())
-                        # Also check if content is a string directly
-                        elif isinstance(content, str) and content.strip():
-                            messages.append(content.strip())
-        
-        # Schema 3: role-based messages (assistant role)
-        if data.get("role") == "assistant":
-            if "content" in data:
-                content = data["content"]
-                if isinstance(content, str) and content.strip():
-                    messages.append(content.strip())
-                elif isinstance(content, list):
-                    for item in content:
-                        if isinstance(item, dict) and "text" in item:
-                            text = item.get("text")
-                            if isinstance(text, str) and text.strip():
-                                messages.append(text.strip())
-                        elif isinstance(item, str) and item.strip():
-                            messages.append(item.strip())
-        
-        # Schema 4: direct text/result fields
-        for field in ["text", "result", "message", "content", "response_text"]:
-            if field in data:
-                value = data[field]
-                if isinstance(value, str) and value.strip():
-                    messages.append(value.strip())
-                elif isinstance(value, dict) and "text" in value:
-                    text = value.get("text")
-                    if isinstance(text, str) and text.strip():
-                        messages.append(text.strip())
-        
-        # Schema 5: nested result/response structures
-        if "result" in data and isinstance(data["result"], dict):
-            result = data["result"]
-            if "text" in result:
-                text = result.get("text")
-                if isinstance(text, str) and text.strip():
-                    messages.append(text.strip())
-            if "output" in result:
-                output = result["output"]
-                if isinstance(output, str) and output.strip():
-                    messages.append(output.strip())
-        
-        return messages
+        """Extract all meaningful messages/results from JSON data (see extract_messages)."""
+        return extract_messages(data)
     
     def _process_existing(self):
         """Process any existing trajectory files."""
         if not self.trajectory_dir.exists():
             return
         
-        for file_path in self.trajectory_dir.rglob("*.json"):
-            if str(file_path) not in self.processed_files:
-                self._process_file(file_path)
+        for path, st in _iter_json(str(self.trajectory_dir)):
+            self._process_file(path, st)
     
     def _extract_timestamp_from_path(self, file_path: Path) -> Optional[datetime]:
         """Extract timestamp from trajectory file path.
@@ -188,95 +286,142 @@ class TrajectoryProcessor(FileSystemEventHandler):
                         datetime_str = f"{date_str} {time_str}"
                         return datetime.strptime(datetime_str, "%Y%m%d %H%M%S")
         except Exception as e:
-            print(f"[TrajectoryProcessor] Warning: Could not extract timestamp from path {file_path}: {e}")
+            logger.warning("Could not extract timestamp from path %s: %s", file_path, e)
         
         return None
     
-    def _process_file(self, file_path: Path):
-        """Process a single trajectory file."""
-        if str(file_path) in self.processed_files:
-            return
+    def _process_file(self, file_path: Union[str, Path], st: Optional[os.stat_result] = None):
+        """Process a single trajectory file, skipping it if unchanged since last processed.
         
+        Args:
+            file_path: Path to the trajectory file
+            st: Optional stat result already obtained by the caller (e.g. from scandir)
+        """
+        path_key = os.fspath(file_path)
+        if st is None:
+            try:
+                st = os.stat(path_key)
+            except OSError:
+                return
+        file_key = (st.st_dev, st.st_ino)
+        version = (st.st_mtime_ns, st.st_size)
+        with self._processed_lock:
+            entry = self.processed_files.get(file_key)
+            if entry is not None and entry[0] == version:
+                self.processed_files.move_to_end(file_key)
+                return
+        
+        # Cache the path forms used below; pathlib .name/str() recompute on every access
+        name = os.path.basename(path_key)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        buf = None
         try:
-            print(f"[TrajectoryProcessor] Processing file: {file_path}")
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if debug:
+                logger.debug("Processing file: %s", path_key)
+            # Both orjson and json parse UTF-8 bytes directly
+            buf = _read_buffer(path_key, st.st_size)
+            # Hash the same buffer the parser reads, so the file's bytes are only loaded once
+            digest = hashlib.sha1(buf, usedforsecurity=False).digest()
+            if entry is not None and entry[1] == digest:
+                # Touched or re-saved with identical content: nothing new to log
+                self._remember(file_key, version, digest, [])
+                return
+            data = _parse_buffer(buf)
+            
+            # Extract meaningful messages/results from JSON
+            extracted_messages = self._extract_messages_from_json(data) if isinstance(data, dict) else []
             
-            self.processed_files.add(str(file_path))
-            print(f"[TrajectoryProcessor] File loaded, keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}")
+            # A rewritten/appended file still holds the messages logged last time; keep only new ones
+            first_seen, extracted_messages = self._remember(file_key, version, digest, extracted_messages)
+            if not first_seen and not extracted_messages:
+                return
+            if debug:
+                logger.debug("File loaded, keys: %s", list(data.keys()) if isinstance(data, dict) else 'not a dict')
             
             # Extract timestamp from file path
-            file_timestamp = self._extract_timestamp_from_path(file_path)
-            if file_timestamp:
-                print(f"[TrajectoryProcessor] Extracted timestamp: {file_timestamp.isoformat()}")
+            file_timestamp = self._extract_timestamp_from_path(Path(path_key))
+            if file_timestamp and debug:
+                logger.debug("Extracted timestamp: %s", file_timestamp.isoformat())
             
-            # Extract meaningful messages/results from JSON
-            extracted_messages = []
-            if isinstance(data, dict):
-                extracted_messages = self._extract_messages_from_json(data)
+            batch = []
+            if extracted_messages:
+                # Same metadata for every message from this file - build it once
+                message_meta = {"type": "agent_response", "source": "trajectory", "file": name}
                 
                 # Log each extracted message with the file's timestamp
                 for msg in extracted_messages:
                     if msg:  # Only log non-empty messages
-                        print(f"[TrajectoryProcessor] Extracted message: {msg[:100]}...")
-                        self.mongo.write_log(
-                            task_id=self.task_id,
-                            level="info",
-                            message=msg,
-                            meta={"type": "agent_response", "source": "trajectory", "file": file_path.name},
-                            timestamp=file_timestamp  # Use extracted timestamp for accurate chronological ordering
-                        )
-                
-                # Extract agent responses from output (legacy support)
-                if "output" in data:
-                    for item in data.get("output", []):
-                        if item.get("type") == "message":
-                            content = item.get("content", [])
-                            for cp in content:
-                                if isinstance(cp, dict):
-                                    # Image processing removed - VNC stream used instead
-                                    pass
-                
-                # Check for nested trajectory data
-                if "trajectory" in data:
-                    self._process_trajectory_data(data["trajectory"])
+                        if debug:
+                            logger.debug("Extracted message: %s...", msg[:100])
+                        batch.append({
+                            "task_id": self.task_id,
+                            "level": "info",
+                            "message": msg,
+                            "meta": message_meta,
+                            "timestamp": file_timestamp  # Use extracted timestamp for accurate chronological ordering
+                        })
             
             # Store a summary log entry (only if no messages were extracted, to avoid duplicate logs)
             if not extracted_messages:
-                self.mongo.write_log(
-                    task_id=self.task_id,
-                    level="debug",
-                    message=f"Trajectory processed: {file_path.name}",
-                    meta={"trajectory_file": str(file_path), "data": data},
-                    timestamp=file_timestamp
-                )
+                # Reference the file by size/hash instead of re-serializing the whole document
+                meta = {"trajectory_file": path_key, "size": len(buf), "sha1": digest.hex()}
+                if STORE_TRAJECTORY_BODY:
+                    meta["data"] = data
+                batch.append({
+                    "task_id": self.task_id,
+                    "level": "debug",
+                    "message": f"Trajectory processed: {name}",
+                    "meta": meta,
+                    "timestamp": file_timestamp
+                })
             else:
                 # Store a brief summary log with count of messages extracted
-                self.mongo.write_log(
-                    task_id=self.task_id,
-                    level="debug",
-                    message=f"Trajectory processed: {file_path.name} ({len(extracted_messages)} messages extracted)",
-                    meta={"trajectory_file": str(file_path), "messages_count": len(extracted_messages)},
-                    timestamp=file_timestamp
-                )
+                batch.append({
+                    "task_id": self.task_id,
+                    "level": "debug",
+                    "message": f"Trajectory processed: {name} ({len(extracted_messages)} messages extracted)",
+                    "meta": {"trajectory_file": path_key, "messages_count": len(extracted_messages)},
+                    "timestamp": file_timestamp
+                })
+            
+            # One insert_many round-trip per file instead of one insert per message
+            self.mongo.write_logs_bulk(batch)
             
         except Exception as e:
-            print(f"Error processing trajectory {file_path}: {e}")
+            logger.error("Error processing trajectory %s: %s", path_key, e)
+        finally:
+            if type(buf) is mmap.mmap:
+                buf.close()
     
     
-    def _process_trajectory_data(self, trajectory_data: Any):
-        """Recursively process nested trajectory data."""
-        if isinstance(trajectory_data, dict):
-            # Screenshot processing removed - VNC stream used instead
-            
-            # Recursively process nested dicts
-            for value in trajectory_data.values():
-                if isinstance(value, (dict, list)):
-                    self._process_trajectory_data(value)
-        elif isinstance(trajectory_data, list):
-            for item in trajectory_data:
-                if isinstance(item, (dict, list)):
-                    self._process_trajectory_data(item)
+    def _remember(
+        self,
+        file_key: Tuple[int, int],
+        version: Tuple[int, int],
+        digest: bytes,
+        messages: List[str]
+    ) -> Tuple[bool, List[str]]:
+        """Record a processed file version, evicting the least recently seen entries past the cap.
+        
+        Claims the messages under the lock, so concurrent runs on the same file
+        (watchdog thread and debounce timers) never log a message twice.
+        
+        Returns:
+            (first_seen, new_messages) - whether the file was unknown, and the messages
+            not already logged for it
+        """
+        with self._processed_lock:
+            processed_files = self.processed_files
+            entry = processed_files.get(file_key)
+            logged = entry[2] if entry is not None else frozenset()
+            new_messages = [msg for msg in messages if hash(msg) not in logged]
+            if new_messages:
+                logged = logged | {hash(msg) for msg in new_messages}
+            processed_files[file_key] = (version, digest, logged)
+            processed_files.move_to_end(file_key)
+            while len(processed_files) > PROCESSED_FILES_MAX:
+                processed_files.popitem(last=False)
+        return entry is None, new_messages
     
     def on_created(self, event):
         """Handle new file creation."""
@@ -284,19 +429,53 @@ class TrajectoryProcessor(FileSystemEventHandler):
             return
         
         if event.src_path.endswith('.json'):
-            self._process_file(Path(event.src_path))
+            self._process_file(event.src_path)
     
     def on_modified(self, event):
-        """Handle file modification."""
+        """Handle file modification (debounced per path)."""
         if event.is_directory:
             return
         
         if event.src_path.endswith('.json'):
-            self._process_file(Path(event.src_path))
+            src_path = event.src_path
+            with self._debounce_lock:
+                # Re-arm the timer so a burst of modify events triggers one read
+                timer = self._debounce_timers.pop(src_path, None)
+                if timer:
+                    timer.cancel()
+                timer = threading.Timer(MODIFY_DEBOUNCE_SECONDS, self._process_debounced, args=(src_path,))
+                timer.daemon = True
+                self._debounce_timers[src_path] = timer
+                timer.start()
+    
+    def _process_debounced(self, src_path: str):
+        """Timer callback: process a file once its modify events have settled."""
+        with self._debounce_lock:
+            self._debounce_timers.pop(src_path, None)
+        self._process_file(src_path)
+
+
+def _start_log_listener():
+    """Route this module's logs through a queue so watchdog threads never block on stdout."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("[TrajectoryProcessor] %(message)s"))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(os.getenv("TRAJECTORY_LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
 
 
 def start_processor(trajectory_dir: Path, mongo_client: MongoClientWrapper, task_id: Optional[int] = None) -> Observer:
     """Start watching trajectory directory."""
+    _start_log_listener()
     processor = TrajectoryProcessor(trajectory_dir, mongo_client, task_id)
     observer = Observer()
     observer.schedule(processor, str(trajectory_dir), recursive=True)
@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 import os
@@ -25,6 +26,19 @@ class DataCollector:
             return None
         return str(v)
 
+    @staticmethod
+    def _meta_text(metadata: Any, key: str) -> str:
+        """Return a stdout/stderr metadata field, inflating it if the agent stored it gzipped."""
+        if not isinstance(metadata, dict):
+            return ""
+        value = metadata.get(key, "")
+        if metadata.get("_gz") and isinstance(value, (bytes, bytearray)):
+            try:
+                return gzip.decompress(value).decode("utf-8", "replace")
+            except Exception:
+                return ""
+        return value
+
     def _now(self) -> datetime:
         return datetime.now(timezone.utc)
 
@@ -87,7 +101,7 @@ class DataCollector:
                 continue
 
             metadata = l.get("metadata", {})
-            stderr = metadata.get("stderr", "")
+            stderr = self._meta_text(metadata, "stderr")
 
             if not stderr and message and "stderr" in message.lower():
                 stderr = message
@@ -329,7 +343,7 @@ class DataCollector:
             for log_entry in logs:
                 message = log_entry.get("message", "")
                 metadata = log_entry.get("metadata", {})
-                stderr = metadata.get("stderr", "") if isinstance(metadata, dict) else ""
+                stderr = self._meta_text(metadata, "stderr")
                 
                 # Check both message and stderr for "Total usage"
                 text_to_search = message + "\n" + stderr
@@ -530,7 +544,7 @@ class DataCollector:
                     continue
 
                 metadata = l.get("metadata", {})
-                stderr = metadata.get("stderr", "")
+                stderr = self._meta_text(metadata, "stderr")
 
                 if not stderr and message and "stderr" in message.lower():
                     stderr = message
@@ -792,7 +806,7 @@ class DataCollector:
                     metadata = l.get("metadata", {})
                     
                     # Check stderr field for CUA usage statistics
-                    stderr = metadata.get("stderr", "")
+                    stderr = self._meta_text(metadata, "stderr")
                     if stderr and isinstance(stderr, str):
                         # Extract response_cost (this is the main metric we want)
                         cost_match = re.search(r"response_cost:\s*\$?([0-9]+(?:\.[0-9]+)?)", stderr)
@@ -922,7 +936,7 @@ class DataCollector:
                 metadata = l.get("metadata", {})
                 
                 # Check stderr field for CUA usage statistics
-                stderr = metadata.get("stderr", "")
+                stderr = self._meta_text(metadata, "stderr")
                 if stderr and isinstance(stderr, str):
                     # Extract response_cost (this is the main metric we want)
                     cost_match = re.search(r"response_cost:\s*\$?([0-9]+(?:\.[0-9]+)?)", stderr)
@@ -3,7 +3,42 @@
 
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
+
+
+# Environment variables passed to execute_task.py when RESTRICT_CHILD_ENV is on
+# (fnmatch patterns); by default the task process inherits the whole environment
+DEFAULT_CHILD_ENV_ALLOWLIST = (
+    "PATH",
+    "HOME",
+    "USER",
+    "LANG",
+    "LC_*",
+    "TZ",
+    "TMPDIR",
+    "DISPLAY",
+    "PYTHON*",
+    "POSTGRES_URL",
+    "CUA_*",
+    "OPENAI_*",
+    "ANTHROPIC_*",
+    "LITELLM_*",
+    "HF_*",
+    "TRANSFORMERS_CACHE",
+    "TRAJECTORY_*",
+    "SSL_CERT_FILE",
+    "SSL_CERT_DIR",
+    "REQUESTS_CA_BUNDLE",
+    "CURL_CA_BUNDLE",
+    "HTTP_PROXY",
+    "HTTPS_PROXY",
+    "NO_PROXY",
+    "ALL_PROXY",
+    "http_proxy",
+    "https_proxy",
+    "no_proxy",
+    "all_proxy",
+)
 
 
 @dataclass
@@ -22,6 +57,9 @@ class Config:
     # Worker settings
     poll_interval_seconds: int
     run_task_timeout_seconds: Optional[int]
+    prefork_worker: bool = True
+    # None passes the whole environment through
+    child_env_allowlist: Optional[Tuple[str, ...]] = None
     
     @classmethod
     def from_env(cls) -> "Config":
@@ -48,11 +86,24 @@ class Config:
         # Default to 600 seconds (10 minutes) if not specified
         run_task_timeout_seconds = int(timeout_val) if timeout_val else 600
         
+        # Keep a warm execute_task.py process ready for the next task
+        prefork_worker = os.getenv("PREFORK_WORKER", "true").lower() not in ("0", "false", "no")
+        
+        # Opt-in: only pass allowlisted variables (plus comma-separated extras) to the task process
+        child_env_allowlist = None
+        if os.getenv("RESTRICT_CHILD_ENV", "false").lower() in ("1", "true", "yes"):
+            extra_env = os.getenv("CHILD_ENV_ALLOWLIST", "")
+            child_env_allowlist = DEFAULT_CHILD_ENV_ALLOWLIST + tuple(
+                name.strip() for name in extra_env.split(",") if name.strip()
+            )
+        
         return cls(
             postgres_dsn=postgres_dsn,
             mongo_uri=mongo_uri,
             agent_id=agent_id,
             poll_interval_seconds=poll_interval_seconds,
-            run_task_timeout_seconds=run_task_timeout_seconds
+            run_task_timeout_seconds=run_task_timeout_seconds,
+            prefork_worker=prefork_worker,
+            child_env_allowlist=child_env_allowlist
         )
 
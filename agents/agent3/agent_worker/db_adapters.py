@@ -3,9 +3,11 @@
 
 import psycopg2
 import psycopg2.pool
-from psycopg2.extras import RealDictCursor
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
 from pymongo import MongoClient
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
+from contextlib import contextmanager
 from datetime import datetime
 import traceback
 import json
@@ -23,6 +25,8 @@ class PostgresClient:
         """
         self.dsn = dsn
         self.conn = None
+        # Set while a checkout() block is active; skips per-call liveness probes
+        self._pinned = False
         self._connect()
     
     def _connect(self):
@@ -45,6 +49,14 @@ class PostgresClient:
     
     def _ensure_connection(self):
         """Ensure connection is alive, reconnect if needed."""
+        if self._pinned and self.conn and self.conn.closed == 0:
+            # Already validated by checkout(); only clear an aborted transaction
+            try:
+                self.conn.rollback()
+            except:
+                pass
+            return
+        
         try:
             if self.conn and self.conn.closed == 0:
                 # Check if transaction is in error state and rollback if needed
@@ -69,6 +81,42 @@ class PostgresClient:
             pass
         self._connect()
     
+    @contextmanager
+    def checkout(self):
+        """
+        Validate the connection once and keep using it for the duration of the block.
+        
+        Calls made inside the block skip the SELECT 1 probe in _ensure_connection,
+        so a task's progress/status/response updates cost one check instead of one each.
+        A connection that breaks inside the block is still replaced on the next call.
+        """
+        if self._pinned:
+            yield self.conn
+            return
+        
+        self._ensure_connection()
+        self._pinned = True
+        try:
+            yield self.conn
+        finally:
+            self._pinned = False
+    
+    def listen(self, channel: str):
+        """
+        Open a dedicated autocommit connection subscribed to a NOTIFY channel.
+        
+        Args:
+            channel: Channel name to LISTEN on
+            
+        Returns:
+            psycopg2 connection; select() on it and call poll() to collect notifies
+        """
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        return conn
+    
     def get_task_by_id(self, task_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific task by ID."""
         self._ensure_connection()
@@ -137,6 +185,58 @@ class PostgresClient:
             print(f"Warning: Failed to get current task: {e}")
             return None
     
+    def get_current_incomplete_task(self, agent_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get the most recent pending task, unless its progress has already reached 100%.
+        
+        Folds get_current_task + get_task_progress_max_percent into one round-trip.
+        Like the two-query check, only the newest pending task is considered; an
+        older pending task is never returned in its place.
+        
+        Returns:
+            Task record as dictionary or None if no task found
+        """
+        self._ensure_connection()
+        try:
+            with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # Pick the newest pending task first, then drop it if it is already complete
+                agent_filter = " AND agent_id = %s" if agent_id else ""
+                query = f"""
+                    SELECT t.id, t.agent_id, t.title, t.description, t.status,
+                           t.metadata, t.created_at, t.updated_at
+                    FROM (
+                        SELECT id, agent_id, title, description, status,
+                               metadata, created_at, updated_at
+                        FROM tasks
+                        WHERE status = 'pending'{agent_filter}
+                        ORDER BY id DESC LIMIT 1
+                    ) t
+                    LEFT JOIN LATERAL (
+                        SELECT MAX(p.progress_percent) AS max_percent
+                        FROM task_progress p
+                        WHERE p.task_id = t.id
+                    ) pr ON TRUE
+                    WHERE pr.max_percent IS NULL OR pr.max_percent < 100
+                """
+                params = (agent_id,) if agent_id else ()
+                cur.execute(query, params)
+                row = cur.fetchone()
+                if row:
+                    return dict(row)
+                return None
+        except Exception as e:
+            # Fall back to the two-query check
+            print(f"Warning: Failed to get current incomplete task: {e}")
+            try:
+                self.conn.rollback()
+            except:
+                pass
+        
+        task = self.get_current_task(agent_id)
+        if task and self.get_task_progress_max_percent(task["id"]) < 100:
+            return task
+        return None
+    
     def get_task_progress_max_percent(self, task_id: int) -> int:
         """
         Get maximum progress percent for a task from task_progress table.
@@ -183,7 +283,8 @@ class PostgresClient:
         task_id: int, 
         agent_id: str, 
         percent: Optional[float], 
-        message: str
+        message: str,
+        timestamp: Optional[datetime] = None
     ) -> None:
         """
         Insert a progress update into task_progress table.
@@ -193,8 +294,10 @@ class PostgresClient:
             agent_id: Agent identifier
             percent: Progress percent (0-100) or None
             message: Progress message
+            timestamp: Optional explicit timestamp (if None, uses current time)
         """
         self._ensure_connection()
+        ts = timestamp or datetime.utcnow()
         
         # Try progress_percent column first (from schema)
         try:
@@ -202,7 +305,7 @@ class PostgresClient:
                 cur.execute("""
                     INSERT INTO task_progress (task_id, agent_id, progress_percent, message, timestamp)
                     VALUES (%s, %s, %s, %s, %s)
-                """, (task_id, agent_id, percent, message, datetime.utcnow()))
+                """, (task_id, agent_id, percent, message, ts))
                 self.conn.commit()
                 return
         except Exception as e:
@@ -218,7 +321,7 @@ class PostgresClient:
                 cur.execute("""
                     INSERT INTO task_progress (task_id, agent_id, percent, message, created_at)
                     VALUES (%s, %s, %s, %s, %s)
-                """, (task_id, agent_id, percent, message, datetime.utcnow()))
+                """, (task_id, agent_id, percent, message, ts))
                 self.conn.commit()
                 return
         except Exception as e:
@@ -234,13 +337,93 @@ class PostgresClient:
                 cur.execute("""
                     INSERT INTO task_progress (task_id, agent_id, message, timestamp)
                     VALUES (%s, %s, %s, %s)
-                """, (task_id, agent_id, message, datetime.utcnow()))
+                """, (task_id, agent_id, message, ts))
                 self.conn.commit()
         except Exception as e:
             self.conn.rollback()
             # Don't raise error - progress updates are optional
             pass
     
+    def insert_progress_bulk(
+        self,
+        rows: List[Tuple[int, str, Optional[float], str, datetime]]
+    ) -> None:
+        """
+        Insert many progress updates into task_progress in one round-trip.
+        
+        Args:
+            rows: (task_id, agent_id, percent, message, timestamp) tuples
+        """
+        if not rows:
+            return
+        self._ensure_connection()
+        
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO task_progress (task_id, agent_id, progress_percent, message, timestamp)
+                    VALUES %s
+                """, rows, page_size=256)
+                self.conn.commit()
+                return
+        except Exception:
+            # Rollback before falling back to per-row inserts
+            try:
+                self.conn.rollback()
+            except:
+                pass
+        
+        # Fallback: per-row inserts handle the alternative column layouts
+        for task_id, agent_id, percent, message, ts in rows:
+            self.insert_progress(task_id, agent_id, percent, message, timestamp=ts)
+    
+    def touch_heartbeat(
+        self,
+        task_id: int,
+        agent_id: str,
+        message: str = "working...",
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """
+        Keep a single heartbeat row per task/agent current instead of appending one per tick.
+        
+        The row is identified by its message with a NULL percent; it is inserted on the
+        first tick and only its timestamp is bumped afterwards.
+        
+        Args:
+            task_id: Task identifier
+            agent_id: Agent identifier
+            message: Heartbeat message
+            timestamp: Optional explicit timestamp (if None, uses current time)
+        """
+        self._ensure_connection()
+        ts = timestamp or datetime.utcnow()
+        
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE task_progress
+                    SET timestamp = %s
+                    WHERE task_id = %s AND agent_id = %s
+                      AND message = %s AND progress_percent IS NULL
+                """, (ts, task_id, agent_id, message))
+                if cur.rowcount == 0:
+                    cur.execute("""
+                        INSERT INTO task_progress (task_id, agent_id, progress_percent, message, timestamp)
+                        VALUES (%s, %s, NULL, %s, %s)
+                    """, (task_id, agent_id, message, ts))
+                self.conn.commit()
+                return
+        except Exception:
+            # Rollback before falling back to a plain insert
+            try:
+                self.conn.rollback()
+            except:
+                pass
+        
+        # Fallback: alternative column layouts
+        self.insert_progress(task_id, agent_id, None, message, timestamp=ts)
+    
     def update_task_status(
         self,
         task_id: int,
@@ -400,6 +583,10 @@ class MongoClientWrapper:
             self.logs.create_index("task_id")
             self.logs.create_index("level")
             self.logs.create_index("timestamp")
+            # Serves the server's per-agent feed: equality on agent_id, level range, newest first
+            self.logs.create_index([("agent_id", 1), ("level", 1), ("created_at", -1)])
+            # Serves unfiltered per-agent reads (read_logs without a level), newest first
+            self.logs.create_index([("agent_id", 1), ("created_at", -1)])
         except Exception as e:
             raise RuntimeError(f"Failed to connect to MongoDB: {e}")
     
@@ -436,6 +623,35 @@ class MongoClientWrapper:
             # Log to console if MongoDB write fails
             print(f"Warning: Failed to write log to MongoDB: {e}")
     
+    def write_logs_bulk(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Write several log entries to MongoDB agent_logs collection in one round-trip.
+        
+        Args:
+            entries: Dicts with task_id, level, message and optional meta/timestamp,
+                matching the write_log arguments
+        """
+        if not entries:
+            return
+        try:
+            now = datetime.utcnow()
+            docs = []
+            for entry in entries:
+                ts = entry.get("timestamp") or now
+                docs.append({
+                    "agent_id": self.agent_id,
+                    "task_id": entry.get("task_id"),
+                    "level": entry["level"],
+                    "message": entry["message"],
+                    "metadata": entry.get("meta") or {},
+                    "timestamp": ts,
+                    "created_at": ts
+                })
+            self.logs.insert_many(docs, ordered=False)
+        except Exception as e:
+            # Log to console if MongoDB write fails
+            print(f"Warning: Failed to write logs to MongoDB: {e}")
+    
     def close(self):
         """Close MongoDB connection."""
         if self.client:
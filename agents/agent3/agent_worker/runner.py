@@ -2,21 +2,132 @@
 """Agent runner that polls for tasks and executes them using execute_task.py."""
 
 import os
+import re
+import gzip
+import json
+import fnmatch
+import queue
+import select
+import selectors
 import subprocess
 import time
 import threading
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Tuple
 from datetime import datetime
 from uuid import uuid4
 
+from bson import Binary
+
 from agent_worker.config import Config
 from agent_worker.db_adapters import PostgresClient, MongoClientWrapper
 
 
 # Removed: list_new_screenshots - CUA trajectory processor handles screenshots
 
+EXECUTE_TASK_SCRIPT = Path(__file__).parent / "execute_task.py"
+
+# (task_id, agent_id, percent, message, timestamp)
+ProgressRow = Tuple[int, str, Optional[float], str, datetime]
+
+HEARTBEAT_MESSAGE = "working..."
+
+# stdout/stderr log payloads at least this long are stored gzipped (with metadata "_gz": True)
+LOG_GZIP_THRESHOLD = 16 * 1024
+
+# Agent response printed by execute_task.py between separator-framed markers
+_RESPONSE_RE = re.compile(
+    r"AGENT_RESPONSE_START.*?\n(?:={3,}\n)?(.*?)(?:\n={3,})?\nAGENT_RESPONSE_END",
+    re.DOTALL
+)
+
+# "Agent: <message>" lines printed by execute_task.py (matched at line start only)
+_AGENT_LINE_RE = re.compile(rb"^Agent:[ \t]+(.+?)[ \t\r]*$", re.MULTILINE)
+
+# Task producers may NOTIFY this channel after inserting a task to wake idle workers
+TASKS_READY_CHANNEL = "tasks_ready"
+
+
+class _ProgressBatcher:
+    """Buffers task_progress writes and applies them in batches from a daemon thread."""
+    
+    def __init__(
+        self,
+        postgres_client: PostgresClient,
+        max_batch: int = 256,
+        flush_interval: float = 0.25
+    ):
+        """
+        Initialize progress batcher.
+        
+        Args:
+            postgres_client: Dedicated PostgreSQL client (not shared with the poll thread)
+            max_batch: Maximum rows written per INSERT
+            flush_interval: Seconds to wait for the first row of a batch
+        """
+        self.postgres = postgres_client
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        # Items are ("progress" | "heartbeat", (task_id, agent_id, percent, message, timestamp))
+        self._queue: "queue.Queue[Tuple[str, ProgressRow]]" = queue.Queue(maxsize=10000)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="progress-batcher", daemon=True)
+        self._thread.start()
+    
+    def enqueue(self, task_id: int, agent_id: str, percent: Optional[float], message: str) -> None:
+        """Queue a progress row; the timestamp is taken now to keep ordering."""
+        self._queue.put(("progress", (task_id, agent_id, percent, message, datetime.utcnow())))
+    
+    def enqueue_heartbeat(self, task_id: int, agent_id: str) -> None:
+        """Queue a heartbeat; consecutive heartbeats collapse into one row per task."""
+        self._queue.put(("heartbeat", (task_id, agent_id, None, HEARTBEAT_MESSAGE, datetime.utcnow())))
+    
+    def flush(self) -> None:
+        """Block until every queued row has been written."""
+        self._queue.join()
+    
+    def close(self) -> None:
+        """Write any remaining rows and stop the flusher thread."""
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.postgres.close()
+    
+    def _drain(self) -> List[Tuple[str, ProgressRow]]:
+        """Wait for one item, then take whatever else is already queued."""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _write(self, batch: List[Tuple[str, ProgressRow]]) -> None:
+        rows = [row for kind, row in batch if kind == "progress"]
+        # Only the latest heartbeat per task/agent matters
+        heartbeats = {(row[0], row[1]): row for kind, row in batch if kind == "heartbeat"}
+        self.postgres.insert_progress_bulk(rows)
+        for task_id, agent_id, _, message, ts in heartbeats.values():
+            self.postgres.touch_heartbeat(task_id, agent_id, message=message, timestamp=ts)
+    
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._drain()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Warning: Failed to write progress batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
 
 class AgentRunner:
     """Agent runner that polls for tasks and executes them."""
@@ -40,59 +151,72 @@ class AgentRunner:
         self.mongo = mongo_client
         self.running = False
         self.current_workdir: Optional[str] = None
+        # Progress rows are written by a background flusher on its own connection
+        self._progress = _ProgressBatcher(PostgresClient(config.postgres_dsn))
+        # execute_task.py process that has already paid interpreter + import cost
+        self._warm_worker: Optional[subprocess.Popen] = None
+        # Dedicated LISTEN connection, opened lazily by _wait_for_tasks
+        self._notify_conn = None
+        # Workdirs (often thousands of screenshots) are deleted off the poll thread
+        self._cleanup = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cleanup")
+        # Full stdout/stderr logs are encoded and shipped to MongoDB off the poll thread
+        self._log_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mongo-log")
     
     def poll_loop(self):
         """Main polling loop that runs indefinitely."""
+        agent_id = self.config.agent_id
+        prefix = f"[{agent_id}]"
+        poll_s = self.config.poll_interval_seconds
+        get_task = self.postgres.get_current_incomplete_task
+        write_log = self.mongo.write_log
+        wait_for_tasks = self._wait_for_tasks
+        idle_msg = f"{prefix} No task found, polling again in {poll_s}s..."
+        
         self.running = True
-        self.mongo.write_log(
+        write_log(
             task_id=None,
             level="info",
-            message=f"Agent worker started (agent_id={self.config.agent_id})"
+            message=f"Agent worker started (agent_id={agent_id})"
         )
-        print(f"[{self.config.agent_id}] Agent worker started")
+        print(f"{prefix} Agent worker started")
+        self._prespawn_worker()
         
         while self.running:
             try:
-                # Poll for current task
-                task = self.postgres.get_current_task(self.config.agent_id)
+                # Poll for current task (tasks already at 100% progress are skipped by the query)
+                task = get_task(agent_id)
                 
                 if not task:
                     # No task available, sleep and continue
-                    print(f"[{self.config.agent_id}] No task found, polling again in {self.config.poll_interval_seconds}s...")
-                    time.sleep(self.config.poll_interval_seconds)
-                    continue
-                
-                task_id = task["id"]
-                
-                # Check progress
-                progress = self.postgres.get_task_progress_max_percent(task_id)
-                
-                if progress >= 100:
-                    # Task already completed, skip
-                    time.sleep(self.config.poll_interval_seconds)
+                    print(idle_msg)
+                    wait_for_tasks(poll_s)
                     continue
                 
-                # Task found and not completed, execute it
-                self._execute_task(task)
+                # Task found and not completed, execute it on one validated connection
+                with self.postgres.checkout():
+                    self._execute_task(task)
                 
             except Exception as e:
                 # Log error and continue polling
                 error_msg = f"Error in poll loop: {str(e)}"
-                print(f"[{self.config.agent_id}] ERROR: {error_msg}")
-                self.mongo.write_log(
+                print(f"{prefix} ERROR: {error_msg}")
+                write_log(
                     task_id=None,
                     level="error",
                     message=error_msg,
                     meta={"exc_info": str(e)}
                 )
-                time.sleep(self.config.poll_interval_seconds)
+                time.sleep(poll_s)
         
-        self.mongo.write_log(
+        self._discard_warm_worker()
+        self._close_notify_conn()
+        self._progress.close()
+        write_log(
             task_id=None,
             level="info",
             message="Agent worker stopped"
         )
-        print(f"[{self.config.agent_id}] Agent worker stopped")
+        print(f"{prefix} Agent worker stopped")
     
     def _execute_task(self, task: dict):
         """
@@ -102,6 +226,15 @@ class AgentRunner:
             task: Task dictionary from database
         """
         task_id = task["id"]
+        agent_id = self.config.agent_id
+        prefix = f"[{agent_id}]"
+        enqueue = self._progress.enqueue
+        enqueue_heartbeat = self._progress.enqueue_heartbeat
+        write_log = self.mongo.write_log
+        description = task.get("description") or ""
+        title = task.get("title")
+        display_title = title or "Unknown"
+        task_description = description or title or f"Task {task_id}"
         workdir = None
         original_cwd = os.getcwd()  # Save original working directory early
         
@@ -109,144 +242,178 @@ class AgentRunner:
             # Create unique working directory
             # Use readable timestamp format: YYYY-MM-DD_HH-MM-SS
             timestamp = datetime.utcnow().strftime("%Y-%m-%d_%H-%M-%S")
-            workdir = f"/tmp/agent_work/{self.config.agent_id}/{task_id}/{timestamp}"
-            workdir_path = Path(workdir)
-            workdir_path.mkdir(parents=True, exist_ok=True)
+            # Creating the screenshots directory creates the workdir and its parents in one call
+            screenshots_dir = os.path.join("/tmp/agent_work", agent_id, str(task_id), timestamp, "screenshots")
+            os.makedirs(screenshots_dir, exist_ok=True)
+            workdir = os.path.dirname(screenshots_dir)
             self.current_workdir = workdir
             
-            # Create screenshots directory
-            screenshots_dir = workdir_path / "screenshots"
-            screenshots_dir.mkdir(exist_ok=True)
-            
             # Log task picked
-            description_preview = task.get("description", "")[:50] if task.get("description") else "No description"
-            self.mongo.write_log(
+            description_preview = description[:50] if description else "No description"
+            write_log(
                 task_id=task_id,
                 level="debug",
-                message=f"Task picked: {task.get('title', 'Unknown')}",
-                meta={"task_id": task_id, "title": task.get("title")}
+                message=f"Task picked: {display_title}",
+                meta={"task_id": task_id, "title": title}
             )
-            print(f"[{self.config.agent_id}] Task {task_id} picked: {task.get('title', 'Unknown')}")
-            print(f"[{self.config.agent_id}] Description: {description_preview}...")
+            print(f"{prefix} Task {task_id} picked: {display_title}")
+            print(f"{prefix} Description: {description_preview}...")
             
             # Insert initial progress
-            self.postgres.insert_progress(
+            enqueue(
                 task_id=task_id,
-                agent_id=self.config.agent_id,
+                agent_id=agent_id,
                 percent=0,
                 message="Task started"
             )
             
-            # Start heartbeat thread for progress updates
-            heartbeat_stop = threading.Event()
-            heartbeat_thread = threading.Thread(
-                target=self._heartbeat_loop,
-                args=(task_id, heartbeat_stop),
-                daemon=True
-            )
-            heartbeat_thread.start()
-            
-            # Get task description
-            task_description = task.get("description", "") or task.get("title", "")
-            if not task_description:
-                task_description = f"Task {task_id}"
-            
             # Execute task using execute_task.py script
-            execute_task_script = Path(__file__).parent / "execute_task.py"
+            execute_task_script = EXECUTE_TASK_SCRIPT
             if not execute_task_script.exists():
                 error_msg = f"execute_task.py not found at {execute_task_script}"
-                print(f"[{self.config.agent_id}] ERROR: {error_msg}")
-                self.mongo.write_log(task_id=task_id, level="error", message=error_msg)
-                self.postgres.insert_progress(task_id=task_id, agent_id=self.config.agent_id, percent=0, message=error_msg)
+                print(f"{prefix} ERROR: {error_msg}")
+                write_log(task_id=task_id, level="error", message=error_msg)
+                enqueue(task_id=task_id, agent_id=agent_id, percent=0, message=error_msg)
                 return
             
-            start_time = time.time()
+            start_time = time.monotonic()
             try:
                 # Pass task description and MongoDB connection info as environment variables
-                env = os.environ.copy()
-                env["TASK_DESCRIPTION"] = task_description
-                env["TASK_ID"] = str(task_id)
-                env["MONGO_URI"] = self.config.mongo_uri
-                env["AGENT_ID"] = self.config.agent_id
-                env["WORKDIR"] = str(workdir_path)
-                print(f"[{self.config.agent_id}] Executing task {task_id} with env: TASK_ID={task_id}, WORKDIR={workdir_path}")
+                task_env = {
+                    "TASK_DESCRIPTION": task_description,
+                    "TASK_ID": str(task_id),
+                    "WORKDIR": workdir
+                }
+                print(f"{prefix} Executing task {task_id} with env: TASK_ID={task_id}, WORKDIR={workdir}")
                 
                 # Use Popen to stream output
-                process = subprocess.Popen(
-                    ["python", "-u", str(execute_task_script), task_description],
-                    cwd=str(workdir_path),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    env=env,
-                    bufsize=1,
-                    universal_newlines=True
-                )
-                
-                stdout_lines = []
-                stderr_lines = []
-                
-                # Function to consume stderr in a separate thread
-                def consume_stderr(stream, accumulator):
-                    for line in stream:
-                        accumulator.append(line)
-                
-                stderr_thread = threading.Thread(target=consume_stderr, args=(process.stderr, stderr_lines))
-                stderr_thread.daemon = True
-                stderr_thread.start()
-                
-                # Read stdout in main thread
-                while True:
-                    # Check timeout
-                    if self.config.run_task_timeout_seconds and time.time() - start_time > self.config.run_task_timeout_seconds:
-                        print(f"[{self.config.agent_id}] Task {task_id} timed out, killing process...")
-                        process.kill()
-                        # Wait for thread to finish to avoid zombie issues, though kill is drastic
-                        break 
+                process = self._start_task_process(task_description, workdir, task_env)
+                
+                stdout_buf = bytearray()
+                stderr_buf = bytearray()
+                # stdout offset up to which complete lines were checked for agent messages
+                scanned = 0
+                # Heartbeats follow agent messages; the timer only covers silent stretches
+                heartbeat_interval = self.config.poll_interval_seconds
+                last_beat = 0.0
+                # Repeated status lines ("Thinking...") only produce one progress row
+                last_agent_msg = None
+                timeout_s = self.config.run_task_timeout_seconds
+                deadline = start_time + timeout_s if timeout_s else None
+                timed_out = False
+                
+                def consume(buf, chunk):
+                    nonlocal scanned, last_beat, last_agent_msg
+                    buf += chunk
+                    if buf is not stdout_buf:
+                        return
+                    end = buf.rfind(b"\n", scanned)
+                    if end == -1:
+                        return
+                    # Only scan complete lines; the partial tail is picked up on the next read
+                    segment = buf[scanned:end]
+                    scanned = end + 1
                     
-                    # Use readline to get line-by-line output
-                    line = process.stdout.readline()
-                    if not line and process.poll() is not None:
-                        break
-                        
-                    if line:
-                        stdout_lines.append(line)
-                        
-                        # Check for agent messages to stream to user
-                        if "Agent: " in line:
-                            try:
-                                msg = line.split("Agent: ", 1)[1].strip()
-                                if msg:
-                                    self.postgres.insert_progress(
+                    # Check for agent messages to stream to user
+                    for match in _AGENT_LINE_RE.finditer(segment):
+                        try:
+                            msg = match.group(1).decode("utf-8", "replace")
+                            if msg:
+                                if msg != last_agent_msg:
+                                    enqueue(
                                         task_id=task_id,
-                                        agent_id=self.config.agent_id,
+                                        agent_id=agent_id,
                                         percent=None,
                                         message=msg
                                     )
-                            except Exception as e:
-                                print(f"[{self.config.agent_id}] Warning: Failed to stream agent message: {e}")
+                                    last_agent_msg = msg
+                                enqueue_heartbeat(task_id=task_id, agent_id=agent_id)
+                                last_beat = time.monotonic()
+                        except Exception as e:
+                            print(f"{prefix} Warning: Failed to stream agent message: {e}")
+                
+                # Multiplex stdout and stderr on this thread; the select timeout keeps
+                # the deadline check accurate even while the child is silent
+                sel = selectors.DefaultSelector()
+                for stream, buf in ((process.stdout, stdout_buf), (process.stderr, stderr_buf)):
+                    os.set_blocking(stream.fileno(), False)
+                    sel.register(stream.fileno(), selectors.EVENT_READ, buf)
+                
+                # On Linux a pidfd becomes readable the moment the child exits, so exit
+                # is detected by the selector itself instead of by EOF on the pipes
+                pidfd = None
+                if hasattr(os, "pidfd_open"):
+                    try:
+                        pidfd = os.pidfd_open(process.pid)
+                        sel.register(pidfd, selectors.EVENT_READ, None)
+                    except OSError:
+                        pidfd = None
+                
+                try:
+                    exited = False
+                    while not exited and len(sel.get_map()) > (1 if pidfd is not None else 0):
+                        # Fallback heartbeat while the agent prints nothing
+                        if time.monotonic() - last_beat >= heartbeat_interval:
+                            enqueue_heartbeat(task_id=task_id, agent_id=agent_id)
+                            last_beat = time.monotonic()
+                        
+                        # Check timeout
+                        wait = 1.0
+                        if deadline is not None:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                print(f"{prefix} Task {task_id} timed out, killing process...")
+                                process.kill()
+                                timed_out = True
+                                break
+                            wait = min(remaining, wait)
+                        
+                        for key, _ in sel.select(timeout=wait):
+                            if key.data is None:
+                                exited = True
+                                continue
+                            chunk = os.read(key.fd, 65536)
+                            if not chunk:
+                                # EOF on this stream
+                                sel.unregister(key.fd)
+                                continue
+                            consume(key.data, chunk)
+                    
+                    if exited:
+                        # Child is gone: drain whatever is still sitting in the pipes
+                        for key in list(sel.get_map().values()):
+                            if key.data is None:
+                                continue
+                            while True:
+                                try:
+                                    chunk = os.read(key.fd, 65536)
+                                except BlockingIOError:
+                                    break
+                                if not chunk:
+                                    break
+                                consume(key.data, chunk)
+                finally:
+                    sel.close()
+                    if pidfd is not None:
+                        os.close(pidfd)
                 
                 # Handle timeout explicitly if loop broke due to timeout
-                if self.config.run_task_timeout_seconds and time.time() - start_time > self.config.run_task_timeout_seconds:
-                     raise subprocess.TimeoutExpired(process.args, self.config.run_task_timeout_seconds)
+                if timed_out:
+                    process.wait()
+                    raise subprocess.TimeoutExpired(process.args, timeout_s)
 
                 process.wait()
-                stderr_thread.join(timeout=5)
                 
-                end_time = time.time()
+                end_time = time.monotonic()
                 duration = end_time - start_time
                 
-                # Stop heartbeat
-                heartbeat_stop.set()
-                heartbeat_thread.join(timeout=1)
-                
                 # Get stdout and stderr
-                stdout = "".join(stdout_lines)
-                stderr = "".join(stderr_lines)
+                stdout = stdout_buf.decode("utf-8", "replace")
+                stderr = stderr_buf.decode("utf-8", "replace")
                 return_code = process.returncode
                 
                 # Log execution result
-                self.mongo.write_log(
+                write_log(
                     task_id=task_id,
                     level="info" if return_code == 0 else "error",
                     message=f"execute_task.py completed (return_code={return_code}, duration={duration:.2f}s)",
@@ -260,19 +427,9 @@ class AgentRunner:
                 
                 # Write full stdout/stderr to logs
                 if stdout:
-                    self.mongo.write_log(
-                        task_id=task_id,
-                        level="debug",
-                        message="execute_task.py stdout",
-                        meta={"stdout": stdout}
-                    )
+                    self._submit_log(task_id, "debug", "execute_task.py stdout", {"stdout": stdout})
                 if stderr:
-                    self.mongo.write_log(
-                        task_id=task_id,
-                        level="debug",
-                        message="execute_task.py stderr",
-                        meta={"stderr": stderr}
-                    )
+                    self._submit_log(task_id, "debug", "execute_task.py stderr", {"stderr": stderr})
                 
                 # Determine final progress percent based on return code
                 if return_code == 0:
@@ -281,37 +438,17 @@ class AgentRunner:
                     final_percent = 0
                 
                 # Insert final progress
-                self.postgres.insert_progress(
+                enqueue(
                     task_id=task_id,
-                    agent_id=self.config.agent_id,
+                    agent_id=agent_id,
                     percent=final_percent,
                     message=f"completed (return_code={return_code})"
                 )
                 
                 # Update task response
                 # Extract agent response from stdout (between AGENT_RESPONSE_START and AGENT_RESPONSE_END markers)
-                response_text = ""
-                if "AGENT_RESPONSE_START" in stdout and "AGENT_RESPONSE_END" in stdout:
-                    # Extract response between markers
-                    start_idx = stdout.find("AGENT_RESPONSE_START")
-                    end_idx = stdout.find("AGENT_RESPONSE_END")
-                    if start_idx != -1 and end_idx != -1:
-                        # Get content between markers
-                        response_section = stdout[start_idx:end_idx]
-                        # Extract lines between the markers (skip the marker lines themselves)
-                        lines = response_section.split('\n')
-                        response_lines = []
-                        in_response = False
-                        separator = "=" * 60
-                        for line in lines:
-                            if "AGENT_RESPONSE_START" in line or separator in line:
-                                in_response = True
-                                continue
-                            if "AGENT_RESPONSE_END" in line:
-                                break
-                            if in_response and line.strip() and separator not in line:
-                                response_lines.append(line)
-                        response_text = '\n'.join(response_lines).strip()
+                match = _RESPONSE_RE.search(stdout)
+                response_text = match.group(1).strip() if match else ""
                 
                 # Fallback: use entire stdout if markers not found
                 if not response_text:
@@ -321,6 +458,9 @@ class AgentRunner:
                 if not response_text:
                     response_text = f"Task completed (return_code={return_code}, duration={duration:.2f}s)"
                 
+                # Make sure streamed progress lands before the task is marked done
+                self._progress.flush()
+                
                 # Update task status to completed
                 try:
                     self.postgres.update_task_status(
@@ -329,19 +469,19 @@ class AgentRunner:
                         metadata={"completed_at": datetime.utcnow().isoformat(), "return_code": return_code}
                     )
                 except Exception as e:
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task status: {e}")
+                    print(f"{prefix} Warning: Failed to update task status: {e}")
                 
                 # Update task response (wrap in try/except to handle transaction errors gracefully)
                 try:
                     self.postgres.update_task_response(
                         task_id=task_id,
-                        agent_id=self.config.agent_id,
+                        agent_id=agent_id,
                         response_text=response_text
                     )
                 except Exception as e:
                     # Log error but don't fail the task execution
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task response: {e}")
-                    self.mongo.write_log(
+                    print(f"{prefix} Warning: Failed to update task response: {e}")
+                    write_log(
                         task_id=task_id,
                         level="warning",
                         message=f"Failed to update task response: {str(e)}"
@@ -352,45 +492,43 @@ class AgentRunner:
                 # If success (0), the agent/trajectory processor handles logging to avoid duplicates
                 if response_text and response_text.strip() and return_code != 0:
                     try:
-                        self.mongo.write_log(
+                        write_log(
                             task_id=task_id,
                             level="info",
                             message=response_text,
                             meta={"source": "agent_output", "type": "agent_response"}
                         )
                     except Exception as e:
-                        print(f"[{self.config.agent_id}] Warning: Failed to log agent response to MongoDB: {e}")
+                        print(f"{prefix} Warning: Failed to log agent response to MongoDB: {e}")
                 
                 # Insert final 100% progress if not already
                 if final_percent < 100:
-                    self.postgres.insert_progress(
+                    enqueue(
                         task_id=task_id,
-                        agent_id=self.config.agent_id,
+                        agent_id=agent_id,
                         percent=100,
                         message="completed"
                     )
                 
-                print(f"[{self.config.agent_id}] Task {task_id} completed (return_code={return_code})")
+                print(f"{prefix} Task {task_id} completed (return_code={return_code})")
                 
             except subprocess.TimeoutExpired:
                 # Task timed out
-                heartbeat_stop.set()
-                heartbeat_thread.join(timeout=1)
-                
                 error_msg = f"execute_task.py timed out after {self.config.run_task_timeout_seconds} seconds"
-                print(f"[{self.config.agent_id}] ERROR: {error_msg}")
-                self.mongo.write_log(
+                print(f"{prefix} ERROR: {error_msg}")
+                write_log(
                     task_id=task_id,
                     level="error",
                     message=error_msg
                 )
                 
-                self.postgres.insert_progress(
+                enqueue(
                     task_id=task_id,
-                    agent_id=self.config.agent_id,
+                    agent_id=agent_id,
                     percent=0,
                     message=error_msg
                 )
+                self._progress.flush()
                 
                 # Update task status to failed
                 try:
@@ -400,18 +538,18 @@ class AgentRunner:
                         metadata={"failed_at": datetime.utcnow().isoformat(), "error": error_msg}
                     )
                 except Exception as e:
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task status: {e}")
+                    print(f"{prefix} Warning: Failed to update task status: {e}")
                 
                 # Update task response (wrap in try/except to handle transaction errors gracefully)
                 try:
                     self.postgres.update_task_response(
                         task_id=task_id,
-                        agent_id=self.config.agent_id,
+                        agent_id=agent_id,
                         response_text=error_msg
                     )
                 except Exception as e:
                     # Log error but don't fail the task execution
-                    print(f"[{self.config.agent_id}] Warning: Failed to update task response: {e}")
+                    print(f"{prefix} Warning: Failed to update task response: {e}")
             
             finally:
                 # Restore original working directory
@@ -423,8 +561,8 @@ class AgentRunner:
         except Exception as e:
             # Log error
             error_msg = f"Error executing task {task_id}: {str(e)}"
-            print(f"[{self.config.agent_id}] ERROR: {error_msg}")
-            self.mongo.write_log(
+            print(f"{prefix} ERROR: {error_msg}")
+            write_log(
                 task_id=task_id,
                 level="error",
                 message=error_msg,
@@ -433,12 +571,13 @@ class AgentRunner:
             
             # Insert error progress
             try:
-                self.postgres.insert_progress(
+                enqueue(
                     task_id=task_id,
-                    agent_id=self.config.agent_id,
+                    agent_id=agent_id,
                     percent=0,
                     message=error_msg
                 )
+                self._progress.flush()
             except:
                 pass
             
@@ -453,38 +592,160 @@ class AgentRunner:
                 pass
         
         finally:
+            # Drain queued progress before the next task is picked
+            self._progress.flush()
+            
             # Cleanup workdir
             if workdir and os.path.exists(workdir):
                 try:
-                    shutil.rmtree(workdir)
+                    # Rename first so the task's path is freed immediately, then delete in the background
+                    trash = f"{workdir}.trash-{uuid4().hex}"
+                    os.rename(workdir, trash)
+                    self._cleanup.submit(shutil.rmtree, trash, ignore_errors=True)
                 except Exception as e:
-                    print(f"[{self.config.agent_id}] Warning: Failed to cleanup workdir {workdir}: {e}")
+                    print(f"{prefix} Warning: Failed to cleanup workdir {workdir}: {e}")
             self.current_workdir = None
+            
+            # Warm up the process for the next task while the loop goes back to polling
+            self._prespawn_worker()
+    
+    def _write_log_async(self, task_id: int, level: str, message: str, meta: dict):
+        """Write a log entry, gzip-compressing large stdout/stderr payloads."""
+        for key in ("stdout", "stderr"):
+            value = meta.get(key)
+            if isinstance(value, str) and len(value) >= LOG_GZIP_THRESHOLD:
+                meta[key] = Binary(gzip.compress(value.encode("utf-8")))
+                meta["_gz"] = True
+        self.mongo.write_log(task_id=task_id, level=level, message=message, meta=meta)
     
-    def _heartbeat_loop(self, task_id: int, stop_event: threading.Event):
+    def _submit_log(self, task_id: int, level: str, message: str, meta: dict):
+        """Hand a log write to the background pool."""
+        try:
+            self._log_pool.submit(self._write_log_async, task_id, level, message, meta)
+        except RuntimeError:
+            # Pool already shut down by stop(); write inline
+            self._write_log_async(task_id, level, message, meta)
+    
+    def _wait_for_tasks(self, timeout: float):
         """
-        Heartbeat loop that writes progress updates while task is running.
+        Wait until a task notification arrives or the timeout passes.
+        
+        Falls back to a plain sleep when the LISTEN connection is unavailable.
         
         Args:
-            task_id: Task identifier
-            stop_event: Event to stop the heartbeat
+            timeout: Maximum seconds to wait
         """
-        while not stop_event.is_set():
+        if self._notify_conn is None:
             try:
-                self.postgres.insert_progress(
-                    task_id=task_id,
-                    agent_id=self.config.agent_id,
-                    percent=None,
-                    message="working..."
-                )
+                self._notify_conn = self.postgres.listen(TASKS_READY_CHANNEL)
+            except Exception as e:
+                print(f"[{self.config.agent_id}] Warning: LISTEN {TASKS_READY_CHANNEL} unavailable: {e}")
+                time.sleep(timeout)
+                return
+        
+        conn = self._notify_conn
+        try:
+            if select.select([conn], [], [], timeout)[0]:
+                conn.poll()
+                conn.notifies.clear()
+        except Exception as e:
+            # Connection dropped; reopen on the next wait
+            print(f"[{self.config.agent_id}] Warning: LISTEN connection lost: {e}")
+            self._close_notify_conn()
+            time.sleep(timeout)
+    
+    def _close_notify_conn(self):
+        """Close the LISTEN connection if open."""
+        conn, self._notify_conn = self._notify_conn, None
+        if conn is not None:
+            try:
+                conn.close()
             except:
-                pass  # Ignore errors in heartbeat
+                pass
+    
+    def _worker_env(self) -> dict:
+        """Base environment shared by every execute_task.py process."""
+        patterns = self.config.child_env_allowlist
+        if patterns is None:
+            env = os.environ.copy()
+        else:
+            env = {
+                name: value for name, value in os.environ.items()
+                if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+            }
+        env.setdefault("LANG", "C.UTF-8")
+        env["MONGO_URI"] = self.config.mongo_uri
+        env["AGENT_ID"] = self.config.agent_id
+        return env
+    
+    def _prespawn_worker(self):
+        """Start an execute_task.py --prefork process that preloads imports and waits on stdin."""
+        if not self.config.prefork_worker or self._warm_worker is not None:
+            return
+        try:
+            self._warm_worker = subprocess.Popen(
+                ["python", "-u", str(EXECUTE_TASK_SCRIPT), "--prefork"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=self._worker_env(),
+                bufsize=0
+            )
+        except Exception as e:
+            print(f"[{self.config.agent_id}] Warning: Failed to pre-spawn worker: {e}")
+    
+    def _discard_warm_worker(self):
+        """Shut down the pre-spawned worker if it never received a task."""
+        process, self._warm_worker = self._warm_worker, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except Exception:
+            process.kill()
+            process.wait()
+    
+    def _start_task_process(self, task_description: str, workdir: str, task_env: dict) -> subprocess.Popen:
+        """
+        Start execute_task.py for a task.
+        
+        The pre-spawned worker is used when it is alive; otherwise a fresh process is started.
+        
+        Args:
+            task_description: Task description passed to the agent
+            workdir: Working directory for the task
+            task_env: Per-task environment variables
             
-            # Sleep for poll interval, or until stop event
-            if stop_event.wait(self.config.poll_interval_seconds):
-                break
+        Returns:
+            Running process with stdout/stderr pipes
+        """
+        process, self._warm_worker = self._warm_worker, None
+        if process is not None and process.poll() is None:
+            payload = {"task_description": task_description, "workdir": workdir, "env": task_env}
+            try:
+                process.stdin.write(json.dumps(payload).encode("utf-8") + b"\n")
+                process.stdin.close()
+                return process
+            except OSError as e:
+                print(f"[{self.config.agent_id}] Warning: Pre-spawned worker unavailable, starting a new one: {e}")
+                process.kill()
+                process.wait()
+        
+        env = self._worker_env()
+        env.update(task_env)
+        return subprocess.Popen(
+            ["python", "-u", str(EXECUTE_TASK_SCRIPT), task_description],
+            cwd=workdir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            bufsize=0
+        )
     
     def stop(self):
         """Stop the polling loop gracefully."""
         self.running = False
+        self._cleanup.shutdown(wait=False)
+        self._log_pool.shutdown(wait=False)
 
@@ -8,7 +8,7 @@ import os
 import subprocess
 import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Set
 
 class AgentManager:
     """Manages agent lifecycle - starts and monitors agent processes."""
@@ -121,6 +121,10 @@ class AgentManager:
         for agent_id in self.agents.keys():
             self.stop_agent(agent_id)
 
+    def get_running_ids(self) -> Set[str]:
+        """Get the IDs of all agents whose process is alive, polling each process once."""
+        return {agent_id for agent_id in self.agents.keys() if self.is_agent_running(agent_id)}
+
     def get_status(self) -> dict:
         """Get status of all agents."""
         return {
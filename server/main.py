@@ -5,17 +5,27 @@ FastAPI server for managing tasks, agents, and chat interface.
 """
 
 import os
+import re
 import time
+import heapq
+import base64
+import asyncio
+import functools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import httpx
 import json
+import orjson
 import openai
 
 # Import storage adapters
@@ -29,6 +39,52 @@ from agent_manager import AgentManager
 # Agent constants
 AGENT_IDS = ["agent1", "agent2", "agent3"]
 
+# System message patterns excluded from /chat/agent-responses
+SYSTEM_MESSAGE_PATTERNS = [
+    "task picked:",
+    "task completed",
+    "trajectory processed:",
+    "agent worker started",
+    "agent worker stopped",
+    "execution result",
+    "agent_response_start",
+    "agent_response_end",
+    "execute_task.py stdout",
+    "execute_task.py stderr",
+    "execute_task.py completed",
+]
+# Compiled once; PyMongo sends it as a BSON regex inside the log $match
+SYSTEM_MESSAGE_RE = re.compile("|".join(re.escape(p) for p in SYSTEM_MESSAGE_PATTERNS), re.IGNORECASE)
+
+# Log levels shown in /chat/agent-responses; an explicit $in (rather than $ne "debug")
+# lets MongoDB seek the (agent_id, level, created_at) index
+VISIBLE_LOG_LEVELS = ["info", "warning", "error"]
+
+# Upper bound for /chat/agent-responses; keeps per-agent reads and task ID lookups small
+MAX_AGENT_RESPONSES_LIMIT = 200
+
+# Upper bound for /chat/history page sizes
+MAX_CHAT_HISTORY_LIMIT = 500
+
+# Chat message fields returned by /chat/history; leaves out internal bookkeeping like read_by
+CHAT_HISTORY_PROJECTION = {"message_id": 1, "sender": 1, "message": 1, "reply_to": 1, "metadata": 1, "timestamp": 1}
+
+# How long polled read endpoints (history, participants, stats, live) reuse a computed response
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3"))
+
+# How often an open /chat/agent-responses/stream checks for new messages
+AGENT_RESPONSES_STREAM_INTERVAL_SECONDS = float(os.getenv("AGENT_RESPONSES_STREAM_INTERVAL_SECONDS", "2"))
+
+# Most responses kept in the cache at once; the least recently stored are evicted first
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+
+# Oldest entry first, so expired entries are always at the front
+_response_cache: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+# Only keys with a recompute in flight: key -> [lock, number of callers using it]
+_response_cache_locks: Dict[Tuple, List] = {}
+# Bumped per endpoint by invalidate_cached so in-flight recomputes don't store stale data
+_response_cache_generations: Dict[str, int] = {}
+
 
 def detect_target_agents(text: Optional[str]) -> List[str]:
     """Detect agent tags (e.g., @agent2) inside a piece of text."""
@@ -49,11 +105,138 @@ def detect_target_agents(text: Optional[str]) -> List[str]:
     return unique
 
 
+def _store_cached(key: Tuple, value: Any):
+    """Store a response, then drop expired entries and the oldest ones over the size cap."""
+    now = time.monotonic()
+    _response_cache.pop(key, None)
+    _response_cache[key] = (now, value)
+    while _response_cache:
+        oldest_key, (stored_at, _) = next(iter(_response_cache.items()))
+        if now - stored_at < RESPONSE_CACHE_TTL_SECONDS and len(_response_cache) <= RESPONSE_CACHE_MAX_ENTRIES:
+            break
+        _response_cache.pop(oldest_key)
+
+
+def ttl_cached(endpoint):
+    """Serve an async endpoint's response from a short-lived in-process cache.
+    
+    Responses are keyed on the endpoint name and its query parameters and the cache
+    holds at most RESPONSE_CACHE_MAX_ENTRIES of them. Concurrent callers that miss
+    the cache wait on one lock so only the first recomputes it; the lock is dropped
+    once no caller needs it. Errors are not cached, and neither is a response whose
+    endpoint was invalidated while it was being computed.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        key = (endpoint.__name__, tuple(sorted(kwargs.items())))
+        entry = _response_cache.get(key)
+        if entry and time.monotonic() - entry[0] < RESPONSE_CACHE_TTL_SECONDS:
+            return entry[1]
+        
+        lock_entry = _response_cache_locks.setdefault(key, [asyncio.Lock(), 0])
+        lock_entry[1] += 1
+        try:
+            async with lock_entry[0]:
+                entry = _response_cache.get(key)
+                if entry and time.monotonic() - entry[0] < RESPONSE_CACHE_TTL_SECONDS:
+                    return entry[1]
+                generation = _response_cache_generations.get(endpoint.__name__, 0)
+                value = await endpoint(**kwargs)
+                if _response_cache_generations.get(endpoint.__name__, 0) == generation:
+                    _store_cached(key, value)
+                return value
+        finally:
+            lock_entry[1] -= 1
+            if not lock_entry[1]:
+                _response_cache_locks.pop(key, None)
+    
+    return wrapper
+
+
+def invalidate_cached(*endpoint_names: str):
+    """Drop cached responses of the named endpoints (all parameter variants)."""
+    for name in endpoint_names:
+        _response_cache_generations[name] = _response_cache_generations.get(name, 0) + 1
+    for key in [key for key in _response_cache if key[0] in endpoint_names]:
+        _response_cache.pop(key, None)
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Turn a stored log/chat timestamp (datetime or ISO string) into a datetime, or None."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                # Try parsing ISO format with Z
+                return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+            except ValueError:
+                return None
+    return None
+
+
+def encode_history_cursor(message: Dict[str, Any]) -> str:
+    """Encode a chat message's (timestamp, _id) sort key as an opaque pagination cursor."""
+    raw = json.dumps([message["timestamp"], str(message["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_history_cursor(cursor: str) -> Optional[Dict[str, Any]]:
+    """Turn a pagination cursor into a keyset query, or None if it isn't one."""
+    try:
+        timestamp, object_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        object_id = ObjectId(object_id)
+    except Exception:
+        return None
+    return {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": object_id}}
+    ]}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the chat indexes the chat queries rely on, serve, then close connection pools."""
+    # One keep-alive client shared by the evaluator proxy endpoints
+    app.state.evaluator_http = httpx.AsyncClient(
+        base_url=EVALUATOR_URL,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=50)
+    )
+    try:
+        await asyncio.to_thread(CHAT_COLL.create_index, [("timestamp", -1), ("_id", -1)])
+        # Serves the per-sender $group and the newest-first user-message feed
+        await asyncio.to_thread(CHAT_COLL.create_index, [("sender", 1), ("timestamp", -1)])
+    except Exception as e:
+        print(f"Warning: Failed to create chat indexes: {e}")
+    try:
+        await asyncio.to_thread(CHAT_COLL.create_index, "message_id", unique=True)
+    except Exception as e:
+        # Existing data may already hold duplicate ids; still index lookups by message_id
+        print(f"Warning: Failed to create unique message_id index, using a plain one: {e}")
+        try:
+            await asyncio.to_thread(CHAT_COLL.create_index, "message_id")
+        except Exception:
+            pass
+    yield
+    
+    # Release pooled connections on shutdown
+    await app.state.evaluator_http.aclose()
+    pg.engine.dispose()
+    server_mongo.close()
+    agent_mongo.close()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="AI Village Server",
     version="1.0.0",
-    description="Main server for task management and agent coordination"
+    description="Main server for task management and agent coordination",
+    lifespan=lifespan,
+    # orjson encodes the larger message/log payloads much faster than stdlib json
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -71,7 +254,15 @@ app.add_middleware(
 server_mongo = MongoAdapter(agent_id="server", connection_string=os.getenv("MONGODB_URL"))
 agent_mongo = MongoAdapter(agent_id="server", connection_string=os.getenv("MONGODB_URL"), cluster_mode=True)
 
-pg = PostgresAdapter(connection_string=os.getenv("POSTGRES_URL"))
+# Chat messages live in the server database; resolve the collection handle once
+CHAT_COLL = server_mongo.client[server_mongo.db_name or "serverdb"]["chat_messages"]
+
+# Endpoints run adapter calls concurrently in worker threads, so allow up to 20 connections
+pg = PostgresAdapter(
+    connection_string=os.getenv("POSTGRES_URL"),
+    pool_size=int(os.getenv("POSTGRES_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("POSTGRES_MAX_OVERFLOW", "15"))
+)
 
 # Initialize agent manager
 agent_manager = AgentManager()
@@ -159,35 +350,39 @@ class ChatMessageResponse(BaseModel):
 
 # Health check
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 # Task endpoints
 @app.post("/task", response_model=TaskResponse)
-def create_task(task: TaskRequest):
+async def create_task(task: TaskRequest):
     """Create a new task and add it to the queue for all agents to compete."""
     try:
         # Create 3 separate tasks - one for each agent to compete
         target_agents = detect_target_agents(task.text)
         agent_ids = target_agents or AGENT_IDS
-        task_ids = []
         
-        for agent_id in agent_ids:
-            task_id = pg.create_task(
-                agent_id=agent_id,
-                title=task.text[:100],  # Truncate for title
-                description=task.text,
-                status="pending"
-            )
-            task_ids.append(task_id)
-            
-            # Log task creation per agent
-            server_mongo.write_log(
-                level="info",
-                message=f"Task created for {agent_id}: {task.text[:50]}...",
-                task_id=str(task_id),
-                metadata={"target_agents": agent_ids}
-            )
+        # Insert every agent's task in one statement (ids come back in agent order)
+        task_ids = await asyncio.to_thread(pg.create_tasks_bulk, [
+            {
+                "agent_id": agent_id,
+                "title": task.text[:100],  # Truncate for title
+                "description": task.text,
+                "status": "pending"
+            }
+            for agent_id in agent_ids
+        ])
+        
+        # Log task creation per agent in one insert
+        await asyncio.to_thread(server_mongo.write_logs_bulk, [
+            {
+                "level": "info",
+                "message": f"Task created for {agent_id}: {task.text[:50]}...",
+                "task_id": str(task_id),
+                "metadata": {"target_agents": agent_ids}
+            }
+            for agent_id, task_id in zip(agent_ids, task_ids)
+        ])
         
         # Return the first task ID as the "primary" task
         return TaskResponse(
@@ -199,22 +394,22 @@ def create_task(task: TaskRequest):
         raise HTTPException(status_code=500, detail=f"Failed to create task: {str(e)}")
 
 @app.get("/tasks")
-def get_tasks(limit: int = 50, status: Optional[str] = None):
+async def get_tasks(limit: int = 50, status: Optional[str] = None):
     """Get list of tasks."""
     try:
         if status:
-            tasks = pg.get_tasks(status=status, limit=limit)
+            tasks = await asyncio.to_thread(pg.get_tasks, status=status, limit=limit)
         else:
-            tasks = pg.get_tasks(limit=limit)
+            tasks = await asyncio.to_thread(pg.get_tasks, limit=limit)
         return {"tasks": tasks, "count": len(tasks)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get tasks: {str(e)}")
 
 @app.get("/task/{task_id}")
-def get_task(task_id: int):
+async def get_task(task_id: int):
     """Get a specific task."""
     try:
-        task = pg.get_task(task_id)
+        task = await asyncio.to_thread(pg.get_task, task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
         return task
@@ -224,15 +419,20 @@ def get_task(task_id: int):
         raise HTTPException(status_code=500, detail=f"Failed to get task: {str(e)}")
 
 # Chat endpoints
-@app.post("/chat/send", response_model=ChatMessageResponse)
-def send_chat_message(message: ChatMessageRequest):
-    """Send a chat message. User messages create tasks automatically."""
+async def _persist_chat_message(message: ChatMessageRequest, background_tasks: BackgroundTasks) -> ChatMessageResponse:
+    """Store a chat message and, for user messages, create a task per targeted agent.
+    
+    Shared by the send and reply endpoints so neither calls the other's route handler.
+    The task-creation log entries are written after the response is sent.
+    """
     import logging
     logger = logging.getLogger("uvicorn")
     
     try:
-        timestamp = datetime.now(timezone.utc)
-        message_id = f"msg_{int(timestamp.timestamp() * 1000)}"
+        # Read the clock once; the id and the stored/returned timestamp derive from it
+        now_ns = time.time_ns()
+        timestamp = datetime.fromtimestamp(now_ns / 1e9, timezone.utc).isoformat()
+        message_id = f"msg_{now_ns // 1_000_000}"
         
         # Store message in MongoDB (server DB)
         metadata_payload = dict(message.metadata or {})
@@ -243,7 +443,7 @@ def send_chat_message(message: ChatMessageRequest):
             "message": message.message,
             "reply_to": message.reply_to,
             "metadata": metadata_payload,
-            "timestamp": timestamp.isoformat(),
+            "timestamp": timestamp,
             "read_by": []
         }
 
@@ -254,19 +454,22 @@ def send_chat_message(message: ChatMessageRequest):
         # Persist metadata about targeting with the chat message itself
         metadata_payload["target_agents"] = agent_ids
 
-        if server_mongo.db_name:
-             server_mongo.client[server_mongo.db_name]["chat_messages"].insert_one(chat_doc)
-        else:
-             # Fallback if db_name logic in adapter is weird, but it shouldn't be
-             server_mongo.client["serverdb"]["chat_messages"].insert_one(chat_doc)
+        try:
+            await asyncio.to_thread(CHAT_COLL.insert_one, chat_doc)
+        except DuplicateKeyError:
+            # Another message was stored in the same millisecond; message_id is unique
+            message_id = f"{message_id}_{chat_doc['_id']}"
+            chat_doc["message_id"] = message_id
+            await asyncio.to_thread(CHAT_COLL.insert_one, chat_doc)
+        
+        # A new message changes what the cached chat reads would return
+        invalidate_cached("_latest_chat_history", "get_participants", "get_chat_stats")
         
         task_id = None
         agents_notified = None
         
         # If sender is "user", create tasks (one per targeted agent)
         if message.sender == "user":
-            task_ids = []
-            
             # Check for collaborate mode
             is_collaborate = metadata_payload.get("mode") == "collaborate"
             subtasks = {}
@@ -275,9 +478,10 @@ def send_chat_message(message: ChatMessageRequest):
                 import logging
                 logger = logging.getLogger("uvicorn")
                 logger.info(f"🔥 COLLABORATE MODE DETECTED! Decomposing task for {len(agent_ids)} agents...")
-                subtasks = decompose_task(message.message, agent_ids)
+                subtasks = await asyncio.to_thread(decompose_task, message.message, agent_ids)
                 logger.info(f"📝 Subtasks generated: {subtasks}")
             
+            new_tasks = []
             for agent_id in agent_ids:
                 # If collaborate mode, use subtask; otherwise use full message
                 if is_collaborate:
@@ -299,21 +503,27 @@ def send_chat_message(message: ChatMessageRequest):
                         "mode": "solo"
                     }
 
-                agent_task_id = pg.create_task(
-                    agent_id=agent_id,
-                    title=task_title,
-                    description=task_description,
-                    status="pending",
-                    metadata=task_metadata
-                )
-                task_ids.append(agent_task_id)
-                
-                server_mongo.write_log(
-                    level="info",
-                    message=f"User message created task {agent_task_id} for {agent_id} (Mode: {task_metadata.get('mode')})",
-                    task_id=str(agent_task_id),
-                    metadata=task_metadata
-                )
+                new_tasks.append({
+                    "agent_id": agent_id,
+                    "title": task_title,
+                    "description": task_description,
+                    "status": "pending",
+                    "metadata": task_metadata
+                })
+            
+            # Insert every targeted agent's task in one statement (ids come back in agent order)
+            task_ids = await asyncio.to_thread(pg.create_tasks_bulk, new_tasks)
+            
+            # The client only needs the task ids; log the creation once the response is out
+            background_tasks.add_task(server_mongo.write_logs_bulk, [
+                {
+                    "level": "info",
+                    "message": f"User message created task {agent_task_id} for {row['agent_id']} (Mode: {row['metadata'].get('mode')})",
+                    "task_id": str(agent_task_id),
+                    "metadata": row["metadata"]
+                }
+                for row, agent_task_id in zip(new_tasks, task_ids)
+            ])
             
             # Use the first task ID as the primary task ID for the chat message
             task_id = task_ids[0]
@@ -323,7 +533,7 @@ def send_chat_message(message: ChatMessageRequest):
             message_id=message_id,
             sender=message.sender,
             message=message.message,
-            timestamp=timestamp.isoformat(),
+            timestamp=timestamp,
             status="sent",
             task_id=task_id,
             agents_notified=agents_notified,
@@ -333,46 +543,71 @@ def send_chat_message(message: ChatMessageRequest):
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
 @app.get("/chat/history")
-def get_chat_history(limit: int = 50, before: Optional[str] = None):
-    """Get chat history."""
+async def get_chat_history(limit: int = Query(50, ge=1, le=MAX_CHAT_HISTORY_LIMIT), before: Optional[str] = None):
+    """Get chat history.
+    
+    Pages backwards in time using the (timestamp, _id) index. `before` takes the
+    `next_cursor` of a previous response; a plain message_id is still accepted.
+    Only the latest page (no `before`) is served from the response cache.
+    `limit` is capped at MAX_CHAT_HISTORY_LIMIT (422 above it).
+    """
+    if before:
+        return await _read_chat_history(limit, before)
+    return await _latest_chat_history(limit=limit)
+
+@ttl_cached
+async def _latest_chat_history(limit: int):
+    """The newest page of chat history; the one every client polls."""
+    return await _read_chat_history(limit, None)
+
+async def _read_chat_history(limit: int, before: Optional[str]):
+    """Read one page of chat history, newest messages first up to `before`."""
     try:
-        collection = server_mongo.client[server_mongo.db_name or "serverdb"]["chat_messages"]
-        
         query = {}
         if before:
-            query["message_id"] = {"$lt": before}
+            query = decode_history_cursor(before) or {"message_id": {"$lt": before}}
+        
+        messages = await asyncio.to_thread(
+            lambda: list(CHAT_COLL.find(query, CHAT_HISTORY_PROJECTION).sort([("timestamp", -1), ("_id", -1)]).limit(limit).batch_size(limit))
+        )
         
-        messages = list(collection
-            .find(query)
-            .sort("timestamp", -1)
-            .limit(limit))
+        has_more = len(messages) == limit
+        next_cursor = encode_history_cursor(messages[-1]) if has_more else None
         
         # Convert ObjectId to string and format
         for msg in messages:
             msg["_id"] = str(msg["_id"])
         
+        # Fetched newest first for the index; return oldest first
+        messages.reverse()
+        
         return {
-            "messages": list(reversed(messages)),
+            "messages": messages,
             "count": len(messages),
-            "has_more": len(messages) == limit
+            "has_more": has_more,
+            "next_cursor": next_cursor
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get chat history: {str(e)}")
 
+@app.post("/chat/send", response_model=ChatMessageResponse)
+async def send_chat_message(message: ChatMessageRequest, background_tasks: BackgroundTasks):
+    """Send a chat message. User messages create tasks automatically."""
+    return await _persist_chat_message(message, background_tasks)
+
 @app.post("/chat/reply", response_model=ChatMessageResponse)
-def reply_to_message(message: ChatMessageRequest):
+async def reply_to_message(message: ChatMessageRequest, background_tasks: BackgroundTasks):
     """Reply to a specific chat message."""
     if not message.reply_to:
         raise HTTPException(status_code=400, detail="reply_to is required")
     
-    return send_chat_message(message)
+    return await _persist_chat_message(message, background_tasks)
 
 @app.get("/chat/messages/{message_id}")
-def get_message(message_id: str):
+async def get_message(message_id: str):
     """Get a specific chat message."""
     try:
-        collection = server_mongo.client[server_mongo.db_name or "serverdb"]["chat_messages"]
-        message = collection.find_one({"message_id": message_id})
+        message = await asyncio.to_thread(CHAT_COLL.find_one, {"message_id": message_id})
         
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
@@ -385,34 +620,35 @@ def get_message(message_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get message: {str(e)}")
 
 @app.get("/chat/participants")
-def get_participants():
+@ttl_cached
+async def get_participants():
     """Get all chat participants."""
     try:
-        collection = server_mongo.client[server_mongo.db_name or "serverdb"]["chat_messages"]
-        
         # Get message counts per sender
         pipeline = [
             {"$group": {"_id": "$sender", "count": {"$sum": 1}}},
             {"$sort": {"count": -1}}
         ]
-        sender_counts = list(collection.aggregate(pipeline))
+        sender_counts = await asyncio.to_thread(lambda: list(CHAT_COLL.aggregate(pipeline)))
+        counts = {s["_id"]: s["count"] for s in sender_counts}
         
         participants = [
             {
                 "id": "user",
                 "type": "user",
-                "message_count": next((s["count"] for s in sender_counts if s["_id"] == "user"), 0),
+                "message_count": counts.get("user", 0),
                 "status": "active"
             }
         ]
         
-        # Add agents
+        # Add agents; check the agent processes once for the whole list
+        running = agent_manager.get_running_ids()
         for agent_id in AGENT_IDS:
             participants.append({
                 "id": agent_id,
                 "type": "agent",
-                "message_count": next((s["count"] for s in sender_counts if s["_id"] == agent_id), 0),
-                "status": "online" if agent_manager.is_agent_running(agent_id) else "offline",
+                "message_count": counts.get(agent_id, 0),
+                "status": "online" if agent_id in running else "offline",
                 "capabilities": ["computer_use", "web_automation"]
             })
         
@@ -424,25 +660,26 @@ def get_participants():
         raise HTTPException(status_code=500, detail=f"Failed to get participants: {str(e)}")
 
 @app.get("/chat/stats")
-def get_chat_stats():
+@ttl_cached
+async def get_chat_stats():
     """Get chat statistics."""
     try:
-        collection = server_mongo.client[server_mongo.db_name or "serverdb"]["chat_messages"]
-        
-        total = collection.count_documents({})
-        user_messages = collection.count_documents({"sender": "user"})
-        agent_messages = collection.count_documents({"sender": {"$in": AGENT_IDS}})
-        
-        # Most active senders
+        # Count messages per sender in a single pass; every other figure derives from it
         pipeline = [
             {"$group": {"_id": "$sender", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 5}
+            {"$sort": {"count": -1}}
         ]
-        most_active = list(collection.aggregate(pipeline))
+        # Run the Mongo aggregation and the pending-task count concurrently
+        sender_counts, pending_tasks = await asyncio.gather(
+            asyncio.to_thread(lambda: list(CHAT_COLL.aggregate(pipeline))),
+            asyncio.to_thread(pg.count_tasks, status="pending")
+        )
         
-        # Pending tasks
-        pending_tasks = len(pg.get_tasks(status="pending", limit=100))
+        counts = {s["_id"]: s["count"] for s in sender_counts}
+        total = sum(counts.values())
+        user_messages = counts.get("user", 0)
+        agent_messages = sum(counts.get(agent_id, 0) for agent_id in AGENT_IDS)
+        most_active = sender_counts[:5]
         
         return {
             "total_messages": total,
@@ -457,274 +694,298 @@ def get_chat_stats():
 
 # Agent management endpoints
 @app.get("/agents/status")
-def get_agent_status():
+async def get_agent_status():
     """Get status of all agents."""
     return agent_manager.get_status()
 
-@app.post("/agents/start/{agent_id}")
-def start_agent(agent_id: str):
-    """Start a specific agent."""
-    success = agent_manager.start_agent(agent_id)
-    if success:
-        return {"status": "started", "agent_id": agent_id}
-    else:
-        raise HTTPException(status_code=500, detail=f"Failed to start agent {agent_id}")
-
-@app.post("/agents/stop/{agent_id}")
-def stop_agent(agent_id: str):
-    """Stop a specific agent."""
-    agent_manager.stop_agent(agent_id)
-    return {"status": "stopped", "agent_id": agent_id}
+@app.post("/agents/start/{agent_id}", status_code=202)
+async def start_agent(agent_id: str, background_tasks: BackgroundTasks):
+    """Start a specific agent.
+    
+    Spawning the process takes over a second, so it runs after the response is sent;
+    poll /agents/status for the outcome.
+    """
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail=f"Unknown agent {agent_id}")
+    background_tasks.add_task(agent_manager.start_agent, agent_id)
+    return {"status": "starting", "agent_id": agent_id}
+
+@app.post("/agents/stop/{agent_id}", status_code=202)
+async def stop_agent(agent_id: str, background_tasks: BackgroundTasks):
+    """Stop a specific agent (terminates in the background; poll /agents/status)."""
+    if agent_id not in agent_manager.agents:
+        raise HTTPException(status_code=404, detail=f"Unknown agent {agent_id}")
+    background_tasks.add_task(agent_manager.stop_agent, agent_id)
+    return {"status": "stopping", "agent_id": agent_id}
 
-@app.get("/chat/agent-responses")
-def get_agent_responses(limit: int = 60):
-    """Get agent responses from MongoDB logs, joined with task information.
-    Also includes user messages from chat history to ensure they persist.
-    Filters out system messages like 'Task picked', 'Task completed' and prioritizes meaningful agent content.
+async def _fetch_agent_response_items(limit: int) -> Tuple[List[Dict[str, Any]], Dict[int, Dict[str, Any]], Dict[int, float]]:
+    """Collect the newest agent log entries and user chat messages, oldest first.
+    
+    Returns the kept items together with the task info and latest progress for
+    the task IDs they reference.
     """
+    agent_ids = AGENT_IDS
+    all_items = []
+    
+    # Filter, sort, limit and project inside MongoDB. Output from the agent or its
+    # trajectory is always kept; anything else is dropped if it matches a system pattern.
+    log_pipeline = [
+        {"$match": {
+            "level": {"$in": VISIBLE_LOG_LEVELS},
+            "message": {"$nin": [None, ""]},
+            "$or": [
+                {"metadata.source": {"$in": ["trajectory", "agent_output"]}},
+                {"metadata.type": "agent_response"},
+                {"message": {"$not": SYSTEM_MESSAGE_RE}}
+            ]
+        }},
+        {"$sort": {"created_at": -1}},
+        {"$limit": limit},
+        {"$project": {"agent_id": 1, "task_id": 1, "message": 1, "timestamp": 1, "created_at": 1}}
+    ]
+    
+    # Read every agent database and the user chat messages concurrently
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(
+                agent_mongo.aggregate_logs,
+                [{"$match": {"agent_id": agent_id}}] + log_pipeline,
+                agent_id=agent_id,
+                batch_size=limit
+            )
+            for agent_id in agent_ids
+        ),
+        asyncio.to_thread(
+            lambda: list(
+                CHAT_COLL.find({"sender": "user"}, {"message_id": 1, "message": 1, "timestamp": 1})
+                .sort("timestamp", -1).limit(limit).batch_size(limit)
+            )
+        ),
+        return_exceptions=True
+    )
+    
+    # 1. Logs from each agent's database using cluster mode adapter
+    for agent_id, logs in zip(agent_ids, results):
+        if isinstance(logs, Exception):
+            print(f"Warning: Failed to read logs for {agent_id}: {logs}")
+        else:
+            for log in logs:
+                # MongoDB stores timestamp as 'created_at' or 'timestamp'; parse it once here
+                log["_ts"] = parse_timestamp(log.get("created_at") or log.get("timestamp"))
+            all_items.extend(logs)
+    
+    # 2. User chat messages
     try:
-        agent_ids = AGENT_IDS
-        all_items = []
+        chat_messages = results[-1]
+        if isinstance(chat_messages, Exception):
+            raise chat_messages
         
-        # 1. Fetch logs from each agent's database using cluster mode adapter
-        for agent_id in agent_ids:
+        for msg in chat_messages:
+            # Convert chat message to similar structure as logs
+            all_items.append({
+                "_id": str(msg["_id"]),
+                "id": msg["message_id"],
+                "agent_id": "user",
+                "message": msg["message"],
+                "timestamp": msg["timestamp"],
+                "_ts": parse_timestamp(msg["timestamp"]),
+                "task_id": None # Could try to extract from metadata if needed
+            })
+    except Exception as e:
+        print(f"Warning: Failed to read chat messages: {e}")
+    
+    # Keep the most recent 'limit' items, then put them in chronological order
+    # (oldest first). Only the kept items are fully ordered; unparseable
+    # timestamps count as oldest.
+    filtered_items = heapq.nlargest(
+        limit, all_items, key=lambda item: item["_ts"].timestamp() if item["_ts"] else 0
+    )
+    filtered_items.reverse()
+    
+    # Get task IDs from filtered logs (for agents)
+    task_ids = set()
+    for item in filtered_items:
+        if item.get("task_id"):
             try:
-                # Filter out debug logs at query level
-                logs = agent_mongo.read_logs(
-                    agent_id=agent_id,
-                    level={"$ne": "debug"},
-                    limit=limit * 2
-                )
-                for log in logs:
-                    # Add type to distinguish source
-                    log["_source_type"] = "log"
-                    all_items.append(log)
-            except Exception as e:
-                print(f"Warning: Failed to read logs for {agent_id}: {e}")
-        
-        # 2. Fetch user chat messages
-        try:
-            collection = server_mongo.client[server_mongo.db_name or "serverdb"]["chat_messages"]
-            chat_messages = list(collection
-                .find({"sender": "user"})
-                .sort("timestamp", -1)
-                .limit(limit))
-            
-            for msg in chat_messages:
-                # Convert chat message to similar structure as logs
-                all_items.append({
-                    "_id": str(msg["_id"]),
-                    "id": msg["message_id"],
-                    "agent_id": "user",
-                    "message": msg["message"],
-                    "timestamp": msg["timestamp"],
-                    "_source_type": "chat",
-                    "task_id": None, # Could try to extract from metadata if needed
-                    "metadata": msg.get("metadata", {})
-                })
-        except Exception as e:
-            print(f"Warning: Failed to read chat messages: {e}")
-
-        # System message patterns to exclude
-        system_message_patterns = [
-            "task picked:",
-            "task completed",
-            "trajectory processed:",
-            "agent worker started",
-            "agent worker stopped",
-            "execution result",
-            "agent_response_start",
-            "agent_response_end",
-            "execute_task.py stdout",
-            "execute_task.py stderr",
-            "execute_task.py completed",
-        ]
-        
-        def is_system_message(message_text: str, metadata: dict, source_type: str) -> bool:
-            """Check if a message is a system message that should be filtered out."""
-            # Always keep chat messages
-            if source_type == "chat":
-                return False
-
-            if not message_text:
-                return True
-            
-            message_lower = message_text.lower().strip()
-            
-            # Check metadata first - if it's from agent output, trajectory, or marked as agent_response, keep it
-            if metadata:
-                source = metadata.get("source")
-                msg_type = metadata.get("type")
-                if source in ["trajectory", "agent_output"] or msg_type == "agent_response":
-                    return False
-            
-            # Check if message matches any system pattern
-            for pattern in system_message_patterns:
-                if pattern in message_lower:
-                    return True
-            
-            # Default: keep the message (it's likely meaningful)
-            return False
-        
-        # Filter out system messages and prioritize meaningful content
-        meaningful_items = []
-        for item in all_items:
-            message_text = item.get("message", "")
-            metadata = item.get("metadata", {})
-            source_type = item.get("_source_type", "log")
-            
-            # Skip system messages
-            if is_system_message(message_text, metadata, source_type):
-                continue
-            
-            # Prioritize messages from trajectory, agent output, or user chat
-            priority = 0
-            if source_type == "chat":
-                priority = 2 # Highest priority for user messages
-            elif metadata.get("source") in ["trajectory", "agent_output"] or metadata.get("type") == "agent_response":
-                priority = 1
-            
-            meaningful_items.append((priority, item))
-        
-        # Sort by timestamp chronologically (oldest first)
-        def get_sort_key(entry):
-            priority, item = entry
-            # MongoDB stores timestamp as 'created_at' or 'timestamp'
-            timestamp = item.get("created_at") or item.get("timestamp")
-            
-            # Convert timestamp to comparable value
-            if isinstance(timestamp, datetime):
-                ts_value = timestamp.timestamp()
-            elif isinstance(timestamp, str):
-                try:
-                    ts_value = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
-                except:
-                    ts_value = 0
-            else:
-                ts_value = 0
-            return ts_value
-        
-        meaningful_items.sort(key=get_sort_key, reverse=False)  # Oldest first for chronological order
+                task_ids.add(int(item["task_id"]))
+            except (ValueError, TypeError):
+                pass
+    
+    # Fetch task information and latest progress from PostgreSQL concurrently
+    task_map = {}
+    progress_map = {}
+    if task_ids:
+        tasks, progress = await asyncio.gather(
+            asyncio.to_thread(pg.get_tasks_by_ids, list(task_ids)),
+            asyncio.to_thread(pg.get_latest_progress_for_tasks, list(task_ids)),
+            return_exceptions=True
+        )
         
-        # Get the top meaningful items (keep last N to respect limit)
-        # We want the most recent 'limit' items, but sorted chronologically
-        # So we take the last 'limit' items from the sorted list
-        filtered_items = [item for _, item in meaningful_items[-limit:]]
+        if isinstance(tasks, Exception):
+            print(f"Warning: Failed to fetch tasks: {tasks}")
+        else:
+            for task_id, task in tasks.items():
+                task_map[task_id] = {
+                    "id": task.get("id"),
+                    "title": task.get("title"),
+                    "status": task.get("status"),
+                    "description": task.get("description")
+                }
         
-        # Get task IDs from filtered logs (for agents)
-        task_ids = set()
-        for item in filtered_items:
-            if item.get("task_id"):
-                try:
-                    task_ids.add(int(item["task_id"]))
-                except (ValueError, TypeError):
-                    pass
+        if isinstance(progress, Exception):
+            print(f"Warning: Failed to fetch task progress: {progress}")
+        else:
+            progress_map = progress
+    
+    return filtered_items, task_map, progress_map
+
+
+def format_agent_response(
+    item: Dict[str, Any],
+    task_map: Dict[int, Dict[str, Any]],
+    progress_map: Dict[int, float],
+    fallback_timestamp: datetime
+) -> Optional[Dict[str, Any]]:
+    """Shape one log/chat item for the response, or None to skip it."""
+    item_id = str(item.get("id") or item.get("_id", ""))
+    agent_id = item.get("agent_id", "agent")
+    message_text = item.get("message", "")
+    # Parsed once at fetch time; fall back to request time for missing/unparseable values
+    timestamp = item["_ts"] or fallback_timestamp
+    task_id = None
+    
+    # Skip empty messages
+    if not message_text or not message_text.strip():
+        return None
+    
+    # Extract task_id
+    if item.get("task_id"):
+        try:
+            task_id = int(item["task_id"])
+        except (ValueError, TypeError):
+            pass
+    
+    # Get task info
+    task_info = None
+    if task_id and task_id in task_map:
+        task_info = task_map[task_id]
+    
+    # Get progress
+    progress_percent = None
+    if task_id and task_id in progress_map:
+        progress_percent = progress_map[task_id]
+    
+    return {
+        "id": item_id,
+        "agent_id": agent_id,
+        "message": message_text,
+        # orjson writes datetimes as ISO 8601 itself
+        "timestamp": timestamp,
+        "task_id": task_id,
+        "progress_percent": progress_percent,
+        "task": task_info
+    }
+
+
+@ttl_cached
+async def _agent_responses_snapshot(limit: int) -> List[Dict[str, Any]]:
+    """Formatted agent responses, shared by every open /chat/agent-responses/stream."""
+    filtered_items, task_map, progress_map = await _fetch_agent_response_items(limit)
+    fallback_timestamp = datetime.now(timezone.utc)
+    
+    messages = []
+    for item in filtered_items:
+        try:
+            message = format_agent_response(item, task_map, progress_map, fallback_timestamp)
+        except Exception:
+            # Skip malformed logs
+            continue
+        if message is not None:
+            messages.append(message)
+    return messages
+
+@app.get("/chat/agent-responses")
+async def get_agent_responses(limit: int = Query(60, ge=1, le=MAX_AGENT_RESPONSES_LIMIT)):
+    """Get agent responses from MongoDB logs, joined with task information.
+    Also includes user messages from chat history to ensure they persist.
+    Filters out system messages like 'Task picked', 'Task completed' and prioritizes meaningful agent content.
+    `limit` is capped at MAX_AGENT_RESPONSES_LIMIT (422 above it).
+    """
+    try:
+        filtered_items, task_map, progress_map = await _fetch_agent_response_items(limit)
+        fallback_timestamp = datetime.now(timezone.utc)
         
-        # Fetch task information from PostgreSQL
-        task_map = {}
-        if task_ids:
-            for task_id in task_ids:
+        # Items are already in chronological order, so stream them out as they are
+        # formatted instead of building the whole payload in memory first
+        async def stream_messages():
+            yield b'{"messages":['
+            count = 0
+            for item in filtered_items:
                 try:
-                    task = pg.get_task(task_id)
-                    if task:
-                        task_map[task_id] = {
-                            "id": task.get("id"),
-                            "title": task.get("title"),
-                            "status": task.get("status"),
-                            "description": task.get("description")
-                        }
+                    message = format_agent_response(item, task_map, progress_map, fallback_timestamp)
                 except Exception:
-                    pass
-        
-        # Get progress information for tasks from task_progress table
-        progress_map = {}
-        for task_id in task_ids:
-            try:
-                progress_list = pg.get_task_progress(task_id, limit=1)
-                if progress_list:
-                    latest = progress_list[0]
-                    progress_map[task_id] = latest.get("progress_percent") or latest.get("percent")
-            except Exception:
-                pass
-        
-        # Format response
-        messages = []
-        for item in filtered_items:
-            try:
-                item_id = str(item.get("id") or item.get("_id", ""))
-                agent_id = item.get("agent_id", "agent")
-                message_text = item.get("message", "")
-                # MongoDB stores timestamp as 'created_at', use that as primary source
-                timestamp = item.get("created_at") or item.get("timestamp")
-                task_id = None
-                
-                # Skip empty messages
-                if not message_text or not message_text.strip():
+                    # Skip malformed logs
                     continue
-                
-                # Extract task_id
-                if item.get("task_id"):
-                    try:
-                        task_id = int(item["task_id"])
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Get task info
-                task_info = None
-                if task_id and task_id in task_map:
-                    task_info = task_map[task_id]
-                
-                # Get progress
-                progress_percent = None
-                if task_id and task_id in progress_map:
-                    progress_percent = progress_map[task_id]
-                
-                # Format timestamp - ensure proper conversion
-                if isinstance(timestamp, datetime):
-                    pass
-                elif isinstance(timestamp, str):
-                    try:
-                        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    except:
-                        try:
-                            # Try parsing ISO format with Z
-                            timestamp = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
-                        except:
-                            timestamp = datetime.now(timezone.utc)
-                elif not timestamp:
-                    timestamp = datetime.now(timezone.utc)
-                
-                messages.append({
-                    "id": item_id,
-                    "agent_id": agent_id,
-                    "message": message_text,
-                    "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else str(timestamp),
-                    "task_id": task_id,
-                    "progress_percent": progress_percent,
-                    "task": task_info
-                })
-            except Exception as e:
-                # Skip malformed logs
-                continue
-        
-        # Sort by timestamp ascending (chronological order - oldest first)
-        messages.sort(key=lambda x: x.get("timestamp", ""), reverse=False)
+                if message is None:
+                    continue
+                if count:
+                    yield b","
+                yield orjson.dumps(message)
+                count += 1
+            yield b'],"count":' + str(count).encode() + b"}"
         
-        return {
-            "messages": messages,
-            "count": len(messages)
-        }
+        return StreamingResponse(stream_messages(), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get agent responses: {str(e)}")
 
+@app.get("/chat/agent-responses/stream")
+async def stream_agent_responses(request: Request, limit: int = Query(60, ge=1, le=MAX_AGENT_RESPONSES_LIMIT)):
+    """Push agent responses as server-sent events instead of having clients poll.
+    
+    Each event's data is one message shaped like the /chat/agent-responses items.
+    New messages, and messages whose task or progress changed, are sent as they
+    show up. All open streams read from one shared snapshot, so the databases are
+    queried at most once per RESPONSE_CACHE_TTL_SECONDS however many clients listen.
+    """
+    async def event_generator():
+        sent: Dict[str, Tuple[Any, Any]] = {}
+        while not await request.is_disconnected():
+            try:
+                messages = await _agent_responses_snapshot(limit=limit)
+            except Exception as e:
+                print(f"Warning: Failed to refresh agent responses stream: {e}")
+                messages = None
+            
+            if messages is not None:
+                current = {}
+                pushed = False
+                for message in messages:
+                    state = (message["progress_percent"], message["task"])
+                    current[message["id"]] = state
+                    if sent.get(message["id"]) != state:
+                        yield b"data: " + orjson.dumps(message) + b"\n\n"
+                        pushed = True
+                # Only the current window is remembered; older ids never come back
+                sent = current
+                if not pushed:
+                    # Comment line keeps proxies from timing out the idle stream
+                    yield b": keep-alive\n\n"
+            
+            await asyncio.sleep(AGENT_RESPONSES_STREAM_INTERVAL_SECONDS)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Evaluator proxy endpoints
 @app.get("/evaluator/status")
 async def evaluator_status():
     """Proxy to evaluator status endpoint."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{EVALUATOR_URL}/status")
-            return response.json()
+        response = await app.state.evaluator_http.get("/status")
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Evaluator service unavailable: {str(e)}")
     except Exception as e:
@@ -734,9 +995,8 @@ async def evaluator_status():
 async def evaluator_reports():
     """Proxy to evaluator reports endpoint."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{EVALUATOR_URL}/reports")
-            return response.json()
+        response = await app.state.evaluator_http.get("/reports")
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Evaluator service unavailable: {str(e)}")
     except Exception as e:
@@ -746,11 +1006,10 @@ async def evaluator_reports():
 async def evaluator_agent_reports(agent_id: str):
     """Proxy to evaluator agent reports endpoint."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{EVALUATOR_URL}/agent/{agent_id}")
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="No reports for agent")
-            return response.json()
+        response = await app.state.evaluator_http.get(f"/agent/{agent_id}")
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="No reports for agent")
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Evaluator service unavailable: {str(e)}")
     except HTTPException:
@@ -762,11 +1021,10 @@ async def evaluator_agent_reports(agent_id: str):
 async def evaluator_task_report(task_id: str):
     """Proxy to evaluator task report endpoint."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{EVALUATOR_URL}/task/{task_id}")
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Task report not found")
-            return response.json()
+        response = await app.state.evaluator_http.get(f"/task/{task_id}")
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Task report not found")
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Evaluator service unavailable: {str(e)}")
     except HTTPException:
@@ -778,35 +1036,37 @@ async def evaluator_task_report(task_id: str):
 async def evaluator_progress_graph():
     """Proxy to evaluator progress graph endpoint."""
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:  # Longer timeout for graph generation
-            response = await client.get(f"{EVALUATOR_URL}/agents/progress/graph")
-            return response.json()
+        response = await app.state.evaluator_http.get("/agents/progress/graph", timeout=30.0)  # Longer timeout for graph generation
+        return response.json()
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Evaluator service unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate progress graph: {str(e)}")
 
 @app.get("/agents/live")
-def get_agents_live(limit_per_agent: int = 10):
+@ttl_cached
+async def get_agents_live(limit_per_agent: int = 10):
     """Get live agent data including progress."""
     try:
         agent_ids = AGENT_IDS
         agents_data = []
         
-        for agent_id in agent_ids:
+        # Use PostgresAdapter to get recent progress for every agent concurrently
+        results = await asyncio.gather(
+            *(asyncio.to_thread(pg.get_recent_progress, agent_id=agent_id, limit=5) for agent_id in agent_ids),
+            return_exceptions=True
+        )
+        
+        for agent_id, progress_list in zip(agent_ids, results):
             # Get progress info
             latest_progress = None
             progress_updates = []
-            try:
-                # Use PostgresAdapter to get recent progress
-                if hasattr(pg, "get_recent_progress"):
-                    progress_list = pg.get_recent_progress(agent_id=agent_id, limit=5)
-                    if progress_list:
-                        latest_progress = progress_list[0]
-                        progress_updates = progress_list
-            except Exception as e:
+            if isinstance(progress_list, Exception):
                 # Log error but don't fail request
-                print(f"Failed to get progress for {agent_id}: {e}")
+                print(f"Failed to get progress for {agent_id}: {progress_list}")
+            elif progress_list:
+                latest_progress = progress_list[0]
+                progress_updates = progress_list
             
             # Build agent data
             agents_data.append({
@@ -7,178 +7,342 @@ This helps verify that:
 3. Agent IDs are properly aligned between backend and frontend
 """
 
+import argparse
 import asyncio
-import json
+import functools
 import httpx
+import importlib.util
+import io
+import orjson
+import os
 import sys
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 # Add the workspace to the path
 workspace_root = Path(__file__).parent
 sys.path.insert(0, str(workspace_root))
 
-async def test_evaluator_status(base_url: str = "http://localhost:8001"):
-    """Test the /evaluator/status endpoint."""
+# Shared client so repeated checks reuse keep-alive connections
+_CLIENT: Optional[httpx.AsyncClient] = None
+# Pooled connections belong to the loop that opened them, so the client is
+# rebuilt if it is ever used from a different event loop
+_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+# HTTP/2 needs the optional h2 package (httpx[http2]); fall back to HTTP/1.1 without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+async def _get_client() -> httpx.AsyncClient:
+    """Return the module-level client, creating it on first use in the running loop."""
+    global _CLIENT, _CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _CLIENT is None or _CLIENT.is_closed or _CLIENT_LOOP is not loop:
+        _CLIENT = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=1, keepalive_expiry=30)
+        )
+        _CLIENT_LOOP = loop
+    return _CLIENT
+
+async def _close_client():
+    """Close the module-level client (must run on the loop that used it)."""
+    global _CLIENT, _CLIENT_LOOP
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+        _CLIENT_LOOP = None
+
+# Set EVAL_TEST_VERBOSE=0 to skip the per-entry breakdown/metric value lines
+VERBOSE = os.getenv("EVAL_TEST_VERBOSE", "1") != "0"
+
+# Metrics shown for each agent in the agent_scores report
+_METRIC_KEYS = ("completion_time_s", "error_count", "total_api_calls", "cost_usd")
+
+# Fixed header blocks, formatted once per agent/evaluation
+_AGENT_SCORE_TMPL = (
+    "\nAgent: {agent_id}\n"
+    "  Score: {score}%\n"
+    "  Task ID: {task_id}\n"
+    "  Is Completed: {is_completed}"
+)
+_EVALUATION_TMPL = (
+    "\nEvaluation {number}:\n"
+    "  Task ID: {task_id}\n"
+    "  Agent ID: {agent_id}\n"
+    "  Score: {final_score}\n"
+    "  Has metrics: {has_metrics}\n"
+    "  Has breakdown: {has_breakdown}"
+)
+
+# Agents usually share the same breakdown/metrics shape, so the rendered key list
+# and the per-key line template are built once per shape (keyed by key order)
+_KEY_LIST_CACHE: Dict[Tuple[str, ...], str] = {}
+_ITEM_LINES_CACHE: Dict[Tuple[str, ...], str] = {}
+
+def _format_keys(d: dict) -> str:
+    """Render list(d.keys()) the way print would, reusing the text for repeated shapes."""
+    shape = tuple(d)
+    rendered = _KEY_LIST_CACHE.get(shape)
+    if rendered is None:
+        rendered = _KEY_LIST_CACHE[shape] = str(list(shape))
+    return rendered
+
+def _format_items(d: dict) -> str:
+    """Render one '    - key: value' line per entry; only the values are formatted per call."""
+    shape = tuple(d)
+    template = _ITEM_LINES_CACHE.get(shape)
+    if template is None:
+        template = _ITEM_LINES_CACHE[shape] = "\n".join(
+            "    - " + str(key).replace("{", "{{").replace("}", "}}") + ": {}" for key in shape
+        )
+    return template.format(*d.values())
+
+def _json(response: httpx.Response):
+    """Decode a JSON response body with orjson straight from the raw bytes."""
+    return orjson.loads(response.content)
+
+def _json_preview(data: dict, limit: int = 3000) -> str:
+    """Return the first `limit` chars of the indented JSON for data.
+    
+    Top-level values are serialized one at a time and serialization stops once
+    `limit` chars are available, so large payloads are never dumped in full.
+    The text matches the start of orjson.dumps(data, option=OPT_INDENT_2).
+    """
+    if not data:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()[:limit]
+    
+    parts = ["{"]
+    size = 1
+    for i, (key, val) in enumerate(data.items()):
+        # Nested lines are indented one level deeper than a standalone dump
+        value = orjson.dumps(val, option=orjson.OPT_INDENT_2).decode().replace("\n", "\n  ")
+        part = ("," if i else "") + "\n  " + orjson.dumps(key).decode() + ": " + value
+        parts.append(part)
+        size += len(part)
+        if size >= limit:
+            break
+    else:
+        parts.append("\n}")
+    return "".join(parts)[:limit]
+
+def _drain(out: io.StringIO):
+    """Write everything buffered in out to stdout with a single write, then reset it."""
+    sys.stdout.write(out.getvalue())
+    sys.stdout.flush()
+    out.seek(0)
+    out.truncate()
+
+async def test_evaluator_status(base_url: str = "http://localhost:8001", quiet: bool = False):
+    """Test the /evaluator/status endpoint.
     
-    print("=" * 80)
-    print("Testing /evaluator/status endpoint")
-    print("=" * 80)
-    print(f"Base URL: {base_url}\n")
+    With quiet=True only a one-line pass/fail result is printed after the fetch,
+    and the result is False when an agent's data has issues.
+    """
+    # Output is collected here and written to stdout in one go
+    out = io.StringIO()
+    emit = functools.partial(print, file=out)
+    
+    emit("=" * 80)
+    emit("Testing /evaluator/status endpoint")
+    emit("=" * 80)
+    emit(f"Base URL: {base_url}\n")
     
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Hit the evaluator/status endpoint via server proxy
-            print("Fetching /evaluator/status...")
-            response = await client.get(f"{base_url}/evaluator/status")
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            print("\n✓ Successfully fetched /evaluator/status\n")
-            
-            # Check top-level structure
-            print("Top-level keys:")
-            for key in sorted(data.keys()):
-                print(f"  - {key}")
-            
-            # Check agent_scores
-            print("\n" + "=" * 80)
-            print("AGENT_SCORES Analysis")
-            print("=" * 80)
-            agent_scores = data.get("agent_scores", {})
-            print(f"Number of agents in agent_scores: {len(agent_scores)}")
-            
-            if agent_scores:
-                for agent_id, score_data in agent_scores.items():
-                    print(f"\nAgent: {agent_id}")
-                    print(f"  Score: {score_data.get('score')}%")
-                    print(f"  Task ID: {score_data.get('task_id')}")
-                    print(f"  Is Completed: {score_data.get('is_completed')}")
-                    
-                    # Check breakdown
-                    breakdown = score_data.get("breakdown", {})
-                    print(f"  Breakdown keys: {list(breakdown.keys())}")
-                    if breakdown:
-                        for key, val in breakdown.items():
-                            print(f"    - {key}: {val}")
-                    else:
-                        print("    ⚠ WARNING: No breakdown data!")
-                    
-                    # Check metrics
-                    metrics = score_data.get("metrics", {})
-                    print(f"  Metrics keys: {list(metrics.keys())}")
-                    if metrics:
-                        for key in ["completion_time_s", "error_count", "total_api_calls", "cost_usd"]:
-                            val = metrics.get(key)
-                            if val is not None:
-                                print(f"    - {key}: {val}")
-                    else:
-                        print("    ⚠ WARNING: No metrics data!")
-                    
-                    # Check penalties
-                    penalties = score_data.get("penalties", {})
-                    if penalties and any(v > 0 for v in penalties.values()):
-                        print(f"  Penalties: {penalties}")
-            else:
-                print("⚠ WARNING: No agents in agent_scores!")
-            
-            # Check agent_feedback
-            print("\n" + "=" * 80)
-            print("AGENT_FEEDBACK Analysis")
-            print("=" * 80)
-            agent_feedback = data.get("agent_feedback", {})
-            print(f"Number of agents in agent_feedback: {len(agent_feedback)}")
-            
-            if agent_feedback:
-                for agent_id, feedback in agent_feedback.items():
-                    print(f"\nAgent: {agent_id}")
-                    print(f"  Feedback keys: {list(feedback.keys())}")
-                    
-                    # Check performance_details
-                    perf_details = feedback.get("performance_details", {})
-                    if perf_details:
-                        print(f"  ✓ Has performance_details")
-                        print(f"    - Score: {perf_details.get('score')}%")
-                        print(f"    - Breakdown keys: {list(perf_details.get('breakdown', {}).keys())}")
-                        print(f"    - Metrics keys: {list(perf_details.get('metrics', {}).keys())}")
-                    else:
-                        print(f"  ⚠ WARNING: No performance_details in feedback!")
-                    
-                    # Check other feedback fields
-                    if feedback.get("score"):
-                        print(f"  Score: {feedback.get('score')}")
-                    if feedback.get("strengths"):
-                        print(f"  Strengths: {feedback.get('strengths')[:1]}...")
-                    if feedback.get("weaknesses"):
-                        print(f"  Weaknesses: {feedback.get('weaknesses')[:1]}...")
+        client = await _get_client()
+        # Hit the evaluator/status endpoint via server proxy
+        emit("Fetching /evaluator/status...")
+        response = await client.get(f"{base_url}/evaluator/status")
+        response.raise_for_status()
+        
+        data = _json(response)
+        
+        emit("\n✓ Successfully fetched /evaluator/status\n")
+        
+        if quiet:
+            # Stop at the first agent with a problem; no per-agent report is built
+            has_issue = any(
+                not score_data.get("breakdown") or not score_data.get("metrics")
+                for score_data in data.get("agent_scores", {}).values()
+            ) or any(
+                not feedback.get("performance_details")
+                for feedback in data.get("agent_feedback", {}).values()
+            )
+            if has_issue:
+                emit("⚠ Issues found (run without --quiet for details)")
             else:
-                print("⚠ WARNING: No agents in agent_feedback!")
-            
-            # Check recent_evaluations
-            print("\n" + "=" * 80)
-            print("RECENT_EVALUATIONS Analysis")
-            print("=" * 80)
-            recent_evals = data.get("recent_evaluations", [])
-            print(f"Number of recent evaluations: {len(recent_evals)}")
-            
-            if recent_evals:
-                for i, eval_item in enumerate(recent_evals[:2]):  # Show first 2
-                    print(f"\nEvaluation {i+1}:")
-                    print(f"  Task ID: {eval_item.get('task_id')}")
-                    print(f"  Agent ID: {eval_item.get('agent_id')}")
-                    print(f"  Score: {eval_item.get('scores', {}).get('final_score')}")
-                    print(f"  Has metrics: {bool(eval_item.get('metrics'))}")
-                    print(f"  Has breakdown: {bool(eval_item.get('breakdown'))}")
-            
-            # Summary
-            print("\n" + "=" * 80)
-            print("SUMMARY")
-            print("=" * 80)
-            
-            issues = []
-            
-            # Check if agent_scores have proper structure
+                emit("✓ All checks passed! Backend data is properly normalized.")
+            return not has_issue
+        
+        # Check top-level structure
+        emit("Top-level keys:")
+        for key in sorted(data.keys()):
+            emit(f"  - {key}")
+        
+        # Problems found while walking the payload, reported in the summary
+        issues = []
+        
+        # Check agent_scores
+        emit("\n" + "=" * 80)
+        emit("AGENT_SCORES Analysis")
+        emit("=" * 80)
+        agent_scores = data.get("agent_scores", {})
+        emit(f"Number of agents in agent_scores: {len(agent_scores)}")
+        
+        if agent_scores:
             for agent_id, score_data in agent_scores.items():
+                emit(_AGENT_SCORE_TMPL.format_map({
+                    "agent_id": agent_id,
+                    "score": score_data.get("score"),
+                    "task_id": score_data.get("task_id"),
+                    "is_completed": score_data.get("is_completed")
+                }))
+                
+                # Check breakdown
                 breakdown = score_data.get("breakdown", {})
-                if not breakdown:
+                emit(f"  Breakdown keys: {_format_keys(breakdown)}")
+                if breakdown:
+                    if VERBOSE:
+                        emit(_format_items(breakdown))
+                else:
+                    emit("    ⚠ WARNING: No breakdown data!")
                     issues.append(f"Agent {agent_id}: No breakdown in agent_scores")
                 
+                # Check metrics
                 metrics = score_data.get("metrics", {})
-                if not metrics:
+                emit(f"  Metrics keys: {_format_keys(metrics)}")
+                if metrics:
+                    if VERBOSE:
+                        for key in _METRIC_KEYS:
+                            val = metrics.get(key)
+                            if val is not None:
+                                emit(f"    - {key}: {val}")
+                else:
+                    emit("    ⚠ WARNING: No metrics data!")
                     issues.append(f"Agent {agent_id}: No metrics in agent_scores")
-            
-            # Check if agent_feedback has performance_details
+                
+                # Check penalties
+                penalties = score_data.get("penalties", {})
+                if penalties and any(v > 0 for v in penalties.values()):
+                    emit(f"  Penalties: {penalties}")
+        else:
+            emit("⚠ WARNING: No agents in agent_scores!")
+        
+        # Check agent_feedback
+        emit("\n" + "=" * 80)
+        emit("AGENT_FEEDBACK Analysis")
+        emit("=" * 80)
+        agent_feedback = data.get("agent_feedback", {})
+        emit(f"Number of agents in agent_feedback: {len(agent_feedback)}")
+        
+        if agent_feedback:
             for agent_id, feedback in agent_feedback.items():
-                perf_details = feedback.get("performance_details")
-                if not perf_details:
+                emit(f"\nAgent: {agent_id}")
+                emit(f"  Feedback keys: {_format_keys(feedback)}")
+                
+                # Check performance_details
+                perf_details = feedback.get("performance_details", {})
+                if perf_details:
+                    emit(f"  ✓ Has performance_details")
+                    emit(f"    - Score: {perf_details.get('score')}%")
+                    emit(f"    - Breakdown keys: {_format_keys(perf_details.get('breakdown', {}))}")
+                    emit(f"    - Metrics keys: {_format_keys(perf_details.get('metrics', {}))}")
+                else:
+                    emit(f"  ⚠ WARNING: No performance_details in feedback!")
                     issues.append(f"Agent {agent_id}: No performance_details in agent_feedback")
-            
-            if issues:
-                print("⚠ Issues found:")
-                for issue in issues:
-                    print(f"  - {issue}")
-            else:
-                print("✓ All checks passed! Backend data is properly normalized.")
-            
-            # Print full JSON for debugging
-            print("\n" + "=" * 80)
-            print("Full Response JSON (first 3000 chars):")
-            print("=" * 80)
-            print(json.dumps(data, indent=2)[:3000])
-            
+                
+                # Check other feedback fields
+                if feedback.get("score"):
+                    emit(f"  Score: {feedback.get('score')}")
+                if feedback.get("strengths"):
+                    emit(f"  Strengths: {feedback.get('strengths')[:1]}...")
+                if feedback.get("weaknesses"):
+                    emit(f"  Weaknesses: {feedback.get('weaknesses')[:1]}...")
+        else:
+            emit("⚠ WARNING: No agents in agent_feedback!")
+        
+        # Check recent_evaluations
+        emit("\n" + "=" * 80)
+        emit("RECENT_EVALUATIONS Analysis")
+        emit("=" * 80)
+        recent_evals = data.get("recent_evaluations", [])
+        emit(f"Number of recent evaluations: {len(recent_evals)}")
+        
+        if recent_evals:
+            for i, eval_item in enumerate(recent_evals[:2]):  # Show first 2
+                get = eval_item.get
+                emit(_EVALUATION_TMPL.format_map({
+                    "number": i + 1,
+                    "task_id": get("task_id"),
+                    "agent_id": get("agent_id"),
+                    "final_score": get("scores", {}).get("final_score"),
+                    "has_metrics": "metrics" in eval_item and bool(eval_item["metrics"]),
+                    "has_breakdown": "breakdown" in eval_item and bool(eval_item["breakdown"])
+                }))
+        
+        # Summary
+        emit("\n" + "=" * 80)
+        emit("SUMMARY")
+        emit("=" * 80)
+        
+        if issues:
+            emit("⚠ Issues found:")
+            for issue in issues:
+                emit(f"  - {issue}")
+        else:
+            emit("✓ All checks passed! Backend data is properly normalized.")
+        
+        # Print full JSON for debugging
+        emit("\n" + "=" * 80)
+        emit("Full Response JSON (first 3000 chars):")
+        emit("=" * 80)
+        emit(_json_preview(data, 3000))
+        
     except httpx.ConnectError:
-        print(f"✗ Connection error: Could not connect to {base_url}")
-        print("  Make sure the server is running on port 8001")
+        emit(f"✗ Connection error: Could not connect to {base_url}")
+        emit("  Make sure the server is running on port 8001")
         return False
     except Exception as e:
-        print(f"✗ Error: {e}")
+        emit(f"✗ Error: {e}")
         import traceback
+        _drain(out)
         traceback.print_exc()
         return False
+    except asyncio.CancelledError:
+        # Another base URL answered first; drop this probe's partial report
+        out.seek(0)
+        out.truncate()
+        raise
+    finally:
+        _drain(out)
     
     return True
 
+DEFAULT_BASE_URLS = ["http://localhost:8001"]
+
+async def main(base_urls: Optional[List[str]] = None, quiet: bool = False) -> bool:
+    """Probe every base URL concurrently on the shared client; succeed on the first that works."""
+    pending = {
+        asyncio.create_task(test_evaluator_status(base_url, quiet=quiet))
+        for base_url in (base_urls or DEFAULT_BASE_URLS)
+    }
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(task.result() for task in done):
+                return True
+        return False
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await _close_client()
+
 if __name__ == "__main__":
-    # Try local server first
-    result = asyncio.run(test_evaluator_status("http://localhost:8001"))
+    parser = argparse.ArgumentParser(description="Check the /evaluator/status payload")
+    parser.add_argument("base_urls", nargs="*", metavar="BASE_URL",
+                        help=f"server base URLs to try concurrently (default: {DEFAULT_BASE_URLS[0]})")
+    parser.add_argument("--quiet", action="store_true", help="only print a one-line pass/fail result")
+    args = parser.parse_args()
+    result = asyncio.run(main(args.base_urls, quiet=args.quiet))
     sys.exit(0 if result else 1)